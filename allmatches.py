@@ -3,123 +3,155 @@
 
 """
 allmatches.py - Télécharge tous les matchs depuis le 1er janvier 2023 jusqu'à hier
-et les sauvegarde dans un fichier cache global (cache/all_matches.json).
-Ce fichier servira de base pour les analyses H2H.
-Exécution : python allmatches.py
+et les enregistre dans la base locale des matchs (cache/matches.db).
+Cette base servira pour les analyses H2H.
+Reprise : chaque mois terminé est compacté dans cache/matches.npz puis noté dans
+cache/backfill_checkpoints.json et n'est plus retéléchargé ; plusieurs mois sont
+téléchargés en parallèle (limite de débit globale).
+Exécution : python allmatches.py [--full]   (--full ignore les points de reprise)
 """
 
-import requests
+import asyncio
 import json
 import os
+import sys
 from datetime import datetime, timedelta
-import time
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+import bsd_client
+import match_store
 
 # =======================================================
 # CONFIGURATION
 # =======================================================
-API_TOKEN = os.getenv("BSD_API_TOKEN", "3d0b228fb2f078287b8e6720304f2eea2800cc6d")
-BASE_URL = "https://sports.bzzoiro.com/api"
-HEADERS = {"Authorization": f"Token {API_TOKEN}"}
-
-# Configuration des retries pour les requêtes HTTP
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-session.mount('https://', HTTPAdapter(max_retries=retries))
-
 # Période à télécharger : du 1er janvier 2023 à hier
-START_DATE = datetime(2023, 1, 1).date()
-END_DATE = datetime.now().date() - timedelta(days=1)  # hier
-
-CACHE_DIR = "cache"
-CACHE_FILE = os.path.join(CACHE_DIR, "all_matches.json")
-
-print("="*60)
-print("🚀 TÉLÉCHARGEMENT DE TOUS LES MATCHS DEPUIS 2023")
-print(f"Période : {START_DATE} → {END_DATE}")
-print("="*60)
-
-def fetch_events_page(date_from, date_to, page=1):
-    """
-    Récupère une page d'événements entre deux dates.
-    """
-    url = f"{BASE_URL}/events/"
-    params = {
-        "date_from": date_from.isoformat(),
-        "date_to": date_to.isoformat(),
-        "page": page
-    }
-    try:
-        resp = session.get(url, headers=HEADERS, params=params, timeout=10)
-        if resp.status_code != 200:
-            print(f"   ❌ Erreur {resp.status_code}")
-            return None
-        return resp.json()
-    except Exception as e:
-        print(f"   ❌ Exception: {e}")
-        return None
+START_DATE = match_store.HISTORY_START
+CHECKPOINT_FILE = os.path.join(match_store.CACHE_DIR, "backfill_checkpoints.json")
+MONTH_CONCURRENCY = int(os.environ.get("BSD_BACKFILL_MONTHS", "3"))  # mois téléchargés en parallèle
 
-def fetch_all_events_in_range(date_from, date_to):
+async def store_events_in_range(client, conn, date_from, date_to):
     """
-    Télécharge tous les événements sur une période (gère la pagination).
-    Retourne une liste d'événements.
+    Télécharge une période en flux : chaque page est écrite dans la base dès
+    sa réception, sans garder la période entière en mémoire.
+    Retourne le nombre d'événements enregistrés ; lève bsd_client.IncompleteFetch
+    si une page n'a pas pu être récupérée.
     """
-    all_events = []
-    page = 1
-    while True:
-        print(f"   📡 Page {page}...")
-        data = fetch_events_page(date_from, date_to, page)
-        if not data:
-            break
-        events = data.get("results", [])
-        all_events.extend(events)
-        print(f"      → {len(events)} événements (total {len(all_events)})")
-        if data.get("next") is None:
-            break
-        page += 1
-        time.sleep(0.5)  # pause pour éviter de surcharger l'API
-    return all_events
+    count = 0
+    # Pages lues une seule fois : pas de cache des réponses (refresh=True)
+    async for page in client.paginate("events", bsd_client.date_range_params(date_from, date_to),
+                                      refresh=True, strict=True):
+        count += match_store.upsert_matches(conn, page)
+    return count
 
-def download_all_matches():
+def month_ranges(start, end):
     """
-    Télécharge tous les matchs mois par mois pour éviter les timeouts.
-    Retourne une liste de tous les événements.
+    Découpe la période en mois : liste de (AAAA-MM, premier jour, dernier jour, mois complet).
+    Le dernier mois peut être partiel (jusqu'à end).
     """
-    all_matches = []
-    current_start = START_DATE
-    while current_start <= END_DATE:
+    months = []
+    current_start = start
+    while current_start <= end:
         # Calcul de la fin du mois en cours
         if current_start.month == 12:
             next_month = current_start.replace(year=current_start.year+1, month=1, day=1)
         else:
             next_month = current_start.replace(month=current_start.month+1, day=1)
-        month_end = min(next_month - timedelta(days=1), END_DATE)
-        
-        print(f"\n📅 Mois : {current_start.strftime('%Y-%m')}")
-        events = fetch_all_events_in_range(current_start, month_end)
-        all_matches.extend(events)
-        print(f"   ✅ {len(events)} matchs ajoutés (total {len(all_matches)})")
-        
+        month_end = next_month - timedelta(days=1)
+        months.append((current_start.strftime('%Y-%m'), current_start,
+                       min(month_end, end), month_end <= end))
         current_start = next_month
-        time.sleep(1)  # pause entre les mois pour éviter de surcharger
-    
-    return all_matches
+    return months
+
+def load_checkpoints(path=CHECKPOINT_FILE):
+    """
+    Mois déjà téléchargés entièrement : {AAAA-MM: {"count", "completed_at"}}.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("months", {})
 
-def save_to_cache(matches):
+def save_checkpoints(checkpoints, path=CHECKPOINT_FILE):
     """
-    Sauvegarde la liste des matchs dans le fichier cache.
+    Enregistre les points de reprise (écriture atomique).
     """
-    os.makedirs(CACHE_DIR, exist_ok=True)
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(matches, f, indent=2, ensure_ascii=False)
-    print(f"\n💾 {len(matches)} matchs sauvegardés dans {CACHE_FILE}")
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"months": checkpoints}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
 
-def main():
+async def download_all_matches_async(client, conn, checkpoints, end_date):
+    """
+    Télécharge les mois manquants, MONTH_CONCURRENCY à la fois.
+    Un mois complet n'est marqué terminé qu'une fois toutes ses pages enregistrées
+    et l'instantané matches.npz réécrit (seul fichier conservé en CI avec le
+    journal) : une interruption ne perd que les mois en cours.
+    Un mois dont une requête a échoué sera retéléchargé au prochain lancement.
+    Retourne le nombre d'événements téléchargés.
+    """
+    months = month_ranges(START_DATE, end_date)
+    todo = [m for m in months if m[0] not in checkpoints]
+    skipped = len(months) - len(todo)
+    if skipped:
+        print(f"   ⏭️ {skipped} mois déjà téléchargés (points de reprise)")
+    semaphore = asyncio.Semaphore(MONTH_CONCURRENCY)
+    total = 0
+
+    async def download_month(month, date_from, date_to, complete):
+        nonlocal total
+        async with semaphore:
+            print(f"\n📅 Mois : {month}")
+            try:
+                count = await store_events_in_range(client, conn, date_from, date_to)
+            except bsd_client.IncompleteFetch as e:
+                print(f"   ⚠️ {month} incomplet ({e}), repris au prochain lancement")
+                return
+            total += count
+            match_store.compact_store(conn)
+            match_store.mark_covered(date_from, date_to, conn)
+            print(f"   ✅ {month} : {count} matchs enregistrés (total {total})")
+            if complete:
+                checkpoints[month] = {"count": count, "completed_at": datetime.now().isoformat(timespec="seconds")}
+                save_checkpoints(checkpoints)
+
+    await asyncio.gather(*(download_month(*m) for m in todo))
+    return total
+
+def download_all_matches(client, conn, resume=True, end_date=None):
+    """
+    Télécharge tous les matchs mois par mois pour éviter les timeouts.
+    Chaque page est enregistrée dans la base dès qu'elle est téléchargée ;
+    les mois déjà terminés sont ignorés si resume est vrai.
+    Retourne le nombre total d'événements.
+    """
+    end_date = end_date or datetime.now().date() - timedelta(days=1)  # hier
+    checkpoints = load_checkpoints() if resume else {}
+    if checkpoints and match_store.count_matches(conn) == 0:
+        # Points de reprise sans données (cache perdu) : tout retélécharger
+        print("   ⚠️ Base vide : points de reprise ignorés")
+        checkpoints = {}
+    return asyncio.run(download_all_matches_async(client, conn, checkpoints, end_date))
+
+def main(resume=True, client=None, conn=None):
+    """
+    client, conn : client API et base déjà ouverts (pipeline.py), sinon créés ici
+    (et fermés à la fin).
+    """
+    end_date = datetime.now().date() - timedelta(days=1)
+    print("="*60)
+    print("🚀 TÉLÉCHARGEMENT DE TOUS LES MATCHS DEPUIS 2023")
+    print(f"Période : {START_DATE} → {end_date}")
+    print("="*60)
     print("\n🔄 Téléchargement en cours...")
-    matches = download_all_matches()
-    save_to_cache(matches)
+    own_client, own_conn = client is None, conn is None
+    client = client or bsd_client.BSDClient()
+    conn = conn or match_store.open_store()
+    total = download_all_matches(client, conn, resume, end_date)
+    if own_client:
+        client.close()
+    print(f"\n💾 {total} matchs téléchargés, {match_store.count_matches(conn)} en base ({match_store.STORE_FILE})")
+    if own_conn:
+        conn.close()
     print("\n✅ Téléchargement terminé !")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(resume="--full" not in sys.argv)
@@ -10,6 +10,9 @@
 // VARIABLES GLOBALES
 // =======================================================
 let allData = null;
+let shardManifest = null;   // data/manifest.json si les shards par jour/catégorie sont publiés
+const shardCache = new Map();
+let displayRequest = 0;
 let currentCategory = 'simple';
 let currentSubcat = 'pronostics'; // pour VIP : 'pronostics' ou 'analyses'
 let currentDay = 'today';
@@ -66,17 +69,19 @@ async function initPronostics() {
 }
 
 async function loadData() {
+    if (await loadManifest()) return;
     try {
         const resp = await fetch('data.json?t=' + Date.now());
         if (!resp.ok) throw new Error('Erreur chargement');
-        allData = await resp.json();
-        localStorage.setItem('cachedData', JSON.stringify(allData));
+        const raw = await resp.json();
+        localStorage.setItem('cachedData', JSON.stringify(raw));
+        allData = normalizeData(raw);
         renderBookmakers(allData.bookmakers);
     } catch (error) {
         console.error(error);
         const cached = localStorage.getItem('cachedData');
         if (cached) {
-            allData = JSON.parse(cached);
+            allData = normalizeData(JSON.parse(cached));
             matchesContainer.innerHTML = '<div class="warning">⚠️ Données en cache.</div>';
             renderBookmakers(allData.bookmakers);
         } else {
@@ -85,19 +90,108 @@ async function loadData() {
     }
 }
 
+/**
+ * Charge le manifeste des shards (data/manifest.json).
+ * Retourne false s'il est absent : on retombe alors sur data.json.
+ */
+async function loadManifest() {
+    try {
+        const resp = await fetch('data/manifest.json?t=' + Date.now());
+        if (!resp.ok) return false;
+        shardManifest = await resp.json();
+        allData = { bookmakers: shardManifest.bookmakers, matches: [] };
+        renderBookmakers(allData.bookmakers);
+        return true;
+    } catch (error) {
+        console.error(error);
+        shardManifest = null;
+        return false;
+    }
+}
+
+/**
+ * Charge un shard (matchs d'un jour pour une catégorie).
+ * L'URL contient le hash du contenu : le cache HTTP reste valide tant qu'il ne change pas.
+ */
+async function loadShard(info) {
+    const key = info.path + '?v=' + info.hash;
+    if (!shardCache.has(key)) {
+        shardCache.set(key, fetch(key)
+            .then(resp => {
+                if (!resp.ok) throw new Error('Erreur shard');
+                return resp.json();
+            })
+            .then(raw => normalizeData(raw).matches)
+            .catch(error => {
+                console.error(error);
+                shardCache.delete(key);
+                return [];
+            }));
+    }
+    return shardCache.get(key);
+}
+
+/**
+ * Matchs d'un shard pour une date locale. Les shards sont indexés par la date
+ * de l'API : on charge aussi les jours voisins à cause des fuseaux horaires.
+ */
+async function loadShardMatches(targetDate, shardName) {
+    const target = new Date(targetDate + 'T12:00:00');
+    const days = [-1, 0, 1].map(offset => {
+        const d = new Date(target);
+        d.setDate(target.getDate() + offset);
+        return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
+    });
+    const infos = days
+        .map(day => shardManifest.shards[day] && shardManifest.shards[day][shardName])
+        .filter(info => info && info.count > 0);
+    const parts = await Promise.all(infos.map(loadShard));
+    return parts.flat();
+}
+
 async function loadDataGeneric() {
     try {
         const resp = await fetch('data.json?t=' + Date.now());
         if (!resp.ok) throw new Error('Erreur');
-        const data = await resp.json();
-        localStorage.setItem('cachedData', JSON.stringify(data));
-        return data;
+        const raw = await resp.json();
+        localStorage.setItem('cachedData', JSON.stringify(raw));
+        return normalizeData(raw);
     } catch {
         const cached = localStorage.getItem('cachedData');
-        return cached ? JSON.parse(cached) : null;
+        return cached ? normalizeData(JSON.parse(cached)) : null;
     }
 }
 
+/**
+ * Reconstruit le format complet de data.json à partir du format compact (format 2) :
+ * équipes et ligues dans des tables de correspondance, catégories réduites à des ids.
+ * Un document déjà complet est retourné tel quel.
+ */
+function normalizeData(raw) {
+    if (!raw || raw.format !== 2) return raw;
+    const logoUrl = (entry, kind) => entry.logo_url || raw.logo_urls[kind].replace('{}', entry.logo);
+    const matches = raw.matches.map(({ home: homeIdx, away: awayIdx, league: leagueIdx, ...m }) => {
+        const home = raw.teams[homeIdx];
+        const away = raw.teams[awayIdx];
+        const league = raw.leagues[leagueIdx];
+        return {
+            ...m,
+            home_team: home.name,
+            away_team: away.name,
+            home_logo: logoUrl(home, 'team'),
+            away_logo: logoUrl(away, 'team'),
+            league: league.name,
+            league_logo: logoUrl(league, 'league')
+        };
+    });
+    const byId = new Map(matches.map(m => [m.id, m]));
+    const categories = {};
+    Object.entries(raw.categories || {}).forEach(([cat, ids]) => {
+        categories[cat] = ids.map(id => byId.get(id)).filter(Boolean);
+    });
+    return { ...raw, matches, categories };
+}
+
 /**
  * Met à jour l'affichage des onglets principaux et des sous-onglets VIP
  * en fonction des données disponibles.
@@ -106,10 +200,17 @@ function hideEmptyTabs() {
     // Compter les matchs par catégorie
     const counts = { simple: 0, pro: 0, vip: 0 };
     let hasML = 0; // nombre de matchs avec données ML complètes
-    allData.matches.forEach(m => {
-        counts[m.category]++;
-        if (m.ml_full) hasML++;
-    });
+    if (shardManifest) {
+        Object.values(shardManifest.shards).forEach(day => {
+            Object.keys(counts).forEach(cat => { counts[cat] += day[cat] ? day[cat].count : 0; });
+            hasML += day.analyses ? day.analyses.count : 0;
+        });
+    } else {
+        allData.matches.forEach(m => {
+            counts[m.category]++;
+            if (m.ml_full) hasML++;
+        });
+    }
 
     // Gérer les onglets principaux
     document.querySelectorAll('.tab-btn').forEach(btn => {
@@ -298,25 +399,34 @@ function getLocalDateFromEvent(isoString) {
     return `${year}-${month}-${day}`;
 }
 
-function filterAndDisplay() {
+async function filterAndDisplay() {
     if (!allData || !allData.matches) {
         matchesContainer.innerHTML = '<div class="no-events">Aucun match disponible.</div>';
         return;
     }
 
     const targetDate = getLocalDateString(currentDay);
+    const showAnalyses = currentCategory === 'vip' && currentSubcat === 'analyses';
+    const targetCat = (currentCategory === 'vip' && currentSubcat === 'pronostics') ? 'vip' : currentCategory;
+
+    // Avec les shards, seuls le jour et la catégorie affichés sont téléchargés
+    let matches = allData.matches;
+    if (shardManifest) {
+        const request = ++displayRequest;
+        matches = await loadShardMatches(targetDate, showAnalyses ? 'analyses' : targetCat);
+        if (request !== displayRequest) return; // un autre affichage a été demandé entre-temps
+    }
 
     let filtered;
-    if (currentCategory === 'vip' && currentSubcat === 'analyses') {
+    if (showAnalyses) {
         // Analyses VIP : tous les matchs (quelle que soit leur catégorie) avec des prédictions ML
-        filtered = allData.matches.filter(m => {
+        filtered = matches.filter(m => {
             const eventLocalDate = getLocalDateFromEvent(m.event_date);
             return eventLocalDate === targetDate && m.ml_full;
         });
     } else {
         // Sinon : filtrer par catégorie (simple, pro, ou vip-pronostics)
-        const targetCat = (currentCategory === 'vip' && currentSubcat === 'pronostics') ? 'vip' : currentCategory;
-        filtered = allData.matches.filter(m => {
+        filtered = matches.filter(m => {
             const eventLocalDate = getLocalDateFromEvent(m.event_date);
             return m.category === targetCat && eventLocalDate === targetDate;
         });
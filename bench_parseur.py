@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_parseur.py - Compare l'ancienne et la nouvelle lecture des tableaux FBref
+sur des pages enregistrées (cache des pages de scrapper.py ou fichiers HTML).
+- ancien : suppression des commentaires, BeautifulSoup html.parser sur toute la page,
+  pd.read_html sur le tableau resérialisé
+- nouveau : scrapper.extraire_tableau + scrapper.lignes_tableau (fragment seul)
+Vérifie aussi que les deux lectures donnent les mêmes lignes.
+Exécution : python bench_parseur.py [page.html ...] [--repetitions N]
+"""
+
+import glob
+import gzip
+import os
+import sys
+import time
+from io import StringIO
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import scrapper
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+REPETITIONS = 5
+# Tableaux mesurés : sélecteur, colonnes comparées entre les deux lectures
+TABLEAUX = [
+    (scrapper.SELECTEURS_PAGE_MATCH["tableau_h2h"],
+     [scrapper.NOMS_COLONNES[c] for c in ("DATE", "DOMICILE", "SCORE", "EXTERIEUR")]),
+    (scrapper.SELECTEURS_PAGE_EQUIPE["tableau_matchs"],
+     [scrapper.NOMS_COLONNES[c] for c in ("DATE", "RESULTAT", "ADVERSAIRE")]),
+]
+
+def charger_pages(chemins):
+    """
+    Pages à mesurer : fichiers donnés (.html ou .html.gz), sinon tout le cache des pages.
+    """
+    chemins = chemins or sorted(glob.glob(os.path.join(scrapper.DOSSIER_CACHE_PAGES, "*.html.gz")))
+    pages = []
+    for chemin in chemins:
+        ouvrir = gzip.open if chemin.endswith(".gz") else open
+        with ouvrir(chemin, "rt", encoding="utf-8") as f:
+            pages.append((os.path.basename(chemin), f.read()))
+    return pages
+
+def lecture_ancienne(html, selecteur):
+    html = html.replace("<!--", "").replace("-->", "")
+    tableau = BeautifulSoup(html, "html.parser").select_one(selecteur)
+    if not tableau:
+        return None
+    df = pd.read_html(StringIO(str(tableau)))[0]
+    return df.to_dict('records')
+
+def lecture_nouvelle(html, selecteur):
+    fragment = scrapper.extraire_tableau(html, selecteur)
+    return scrapper.lignes_tableau(fragment) if fragment else None
+
+def mesurer(fonction, html, selecteur, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction(html, selecteur)
+    return (time.perf_counter() - debut) / repetitions, resultat
+
+def memes_lignes(anciennes, nouvelles, colonnes):
+    """
+    Compare les colonnes utiles (pandas met NaN dans les cellules vides, indexe
+    les colonnes par des tuples si l'en-tête a plusieurs lignes et conserve les
+    lignes d'en-tête répétées et les séparateurs tr.spacer, ignorés ici comme
+    toute ligne vide).
+    """
+    def normaliser(lignes):
+        lignes = [{(k[-1] if isinstance(k, tuple) else k): v for k, v in l.items()} for l in lignes]
+        valeurs = [tuple("" if pd.isna(l.get(c)) else str(l.get(c)) for c in colonnes) for l in lignes]
+        return [v for v in valeurs if any(v) and v[0] != colonnes[0]]
+    return normaliser(anciennes) == normaliser(nouvelles)
+
+def main(chemins, repetitions=REPETITIONS):
+    pages = charger_pages(chemins)
+    if not pages:
+        print(f"❌ Aucune page : lancez d'abord scrapper.py (cache {scrapper.DOSSIER_CACHE_PAGES})")
+        return
+    print(f"📄 {len(pages)} pages, {repetitions} répétitions, nouveau parseur : {'lxml' if scrapper.lxml_html else 'html.parser'}")
+    total_ancien = total_nouveau = 0.0
+    for nom, html in pages:
+        for selecteur, colonnes in TABLEAUX:
+            if scrapper.extraire_tableau(html, selecteur) is None:
+                continue
+            t_ancien, anciennes = mesurer(lecture_ancienne, html, selecteur, repetitions)
+            t_nouveau, nouvelles = mesurer(lecture_nouvelle, html, selecteur, repetitions)
+            total_ancien += t_ancien
+            total_nouveau += t_nouveau
+            identique = "✓" if memes_lignes(anciennes, nouvelles, colonnes) else "✗ DIFFÉRENT"
+            print(f"   • {nom[:16]} {selecteur:24} {t_ancien*1000:8.1f} ms → {t_nouveau*1000:6.2f} ms "
+                  f"(x{t_ancien / max(t_nouveau, 1e-9):.0f}) {identique}")
+    if total_nouveau:
+        print(f"\n⏱️ Total : {total_ancien:.2f}s → {total_nouveau:.3f}s (x{total_ancien / total_nouveau:.0f})")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repetitions = REPETITIONS
+    if "--repetitions" in args:
+        i = args.index("--repetitions")
+        repetitions = int(args[i + 1])
+        del args[i:i + 2]
+    main(args, repetitions)
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bsd_client.py - Client partagé de l'API BSD (sports.bzzoiro.com)
+Utilisé par generate_data.py, update_matches.py et allmatches.py.
+Rôle :
+- Une seule session HTTP (pool de connexions, keep-alive) pour tous les endpoints
+- Requêtes asynchrones (asyncio) avec une limite de concurrence par endpoint
+- Limiteur de débit global (token bucket) au lieu de pauses fixes
+- Réponses 429 / Retry-After traitées comme des limitations de débit
+- Générateur asynchrone sur les résultats paginés
+- Cache disque des réponses (TTL + requêtes conditionnelles ETag/Last-Modified)
+"""
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+API_TOKEN = os.getenv("BSD_API_TOKEN", "3d0b228fb2f078287b8e6720304f2eea2800cc6d")
+BASE_URL = "https://sports.bzzoiro.com/api"
+HEADERS = {"Authorization": f"Token {API_TOKEN}"}
+
+# Récupération concurrente des pages (BSD_CONCURRENT=0 pour le mode séquentiel)
+CONCURRENT_PAGES = os.getenv("BSD_CONCURRENT", "1") != "0"
+REQUESTS_PER_SECOND = 4      # débit maximal partagé par toutes les requêtes
+POOL_SIZE = 10               # connexions HTTP conservées ouvertes (keep-alive)
+ENDPOINT_CONCURRENCY = {"events": 4, "predictions": 2}
+DEFAULT_CONCURRENCY = 2
+MAX_RATE_LIMIT_RETRIES = 5   # nombre de 429 tolérés avant d'abandonner une requête
+DEFAULT_RETRY_AFTER = 5      # pause (s) si le 429 n'indique pas de Retry-After
+TIMEOUT = 10
+
+# Cache disque des réponses (BSD_HTTP_CACHE=0 pour le désactiver)
+HTTP_CACHE_ENABLED = os.getenv("BSD_HTTP_CACHE", "1") != "0"
+HTTP_CACHE_DIR = os.path.join("cache", "http")
+OPEN_RANGE_TTL = 15 * 60     # durée de validité (s) des périodes encore ouvertes
+HTTP_CACHE_MAX_AGE = 7 * 24 * 3600  # périodes ouvertes non rafraîchies depuis plus longtemps supprimées
+
+# =======================================================
+# LIMITEUR DE DÉBIT
+# =======================================================
+
+class TokenBucket:
+    """
+    Limiteur de débit (token bucket) partagé par toutes les requêtes.
+    Une pause globale peut être imposée après une réponse 429.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """
+        Prend un jeton si possible. Retourne le délai d'attente (0 si le jeton est pris).
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire_sync(self):
+        """
+        Version bloquante, utilisable depuis des threads.
+        """
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire(self):
+        """
+        Attend (sans bloquer la boucle asyncio) qu'un jeton soit disponible.
+        """
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Suspend toutes les requêtes pendant `seconds` secondes.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+def retry_after_seconds(resp, default=DEFAULT_RETRY_AFTER):
+    """
+    Lit l'en-tête Retry-After (secondes ou date HTTP) d'une réponse.
+    """
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+# =======================================================
+# CACHE DES RÉPONSES
+# =======================================================
+
+def is_closed_range(params):
+    """
+    Une période est close si elle se termine avant hier : ses résultats ne bougent plus.
+    Les requêtes sans période (prédictions...) sont considérées comme ouvertes.
+    """
+    date_to = (params or {}).get("date_to")
+    if not date_to:
+        return False
+    try:
+        end = date.fromisoformat(str(date_to)[:10])
+    except ValueError:
+        return False
+    return end < datetime.now().date() - timedelta(days=1)
+
+class ResponseCache:
+    """
+    Cache disque des réponses JSON, indexé par URL + paramètres.
+    - Périodes closes : conservées indéfiniment
+    - Périodes ouvertes : valides OPEN_RANGE_TTL secondes, puis revalidées
+      avec If-None-Match / If-Modified-Since
+    - Périodes ouvertes non écrites depuis HTTP_CACHE_MAX_AGE secondes : supprimées par prune()
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, ttl=OPEN_RANGE_TTL):
+        self.directory = directory
+        self.ttl = ttl
+
+    def _path(self, url, params):
+        key = json.dumps([url, sorted((params or {}).items())], default=str)
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def get(self, url, params):
+        """
+        Retourne l'entrée en cache ({body, etag, last_modified, fetched_at, closed}) ou None.
+        """
+        path = self._path(url, params)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        """
+        Une entrée est utilisable sans requête si sa période est close ou son TTL non écoulé.
+        """
+        return entry["closed"] or time.time() - entry["fetched_at"] < self.ttl
+
+    def conditional_headers(self, entry):
+        """
+        En-têtes de revalidation d'une entrée expirée.
+        """
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _write(self, url, params, entry):
+        """
+        Écriture atomique d'une entrée (fichier temporaire puis renommage).
+        """
+        path = self._path(url, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def put(self, url, params, body, resp=None):
+        """
+        Enregistre une réponse 200 avec ses validateurs (ETag, Last-Modified).
+        """
+        self._write(url, params, {
+            "url": url,
+            "params": params,
+            "fetched_at": time.time(),
+            "closed": is_closed_range(params),
+            "etag": resp.headers.get("ETag") if resp is not None else None,
+            "last_modified": resp.headers.get("Last-Modified") if resp is not None else None,
+            "body": body,
+        })
+
+    def touch(self, url, params, entry):
+        """
+        Réponse 304 : le contenu est inchangé, on repart pour un TTL complet.
+        L'entrée garde sa classification : une période ouverte à l'écriture reste
+        revalidée, même si elle s'est close depuis.
+        """
+        entry["fetched_at"] = time.time()
+        self._write(url, params, entry)
+
+    def prune(self, max_age=HTTP_CACHE_MAX_AGE):
+        """
+        Supprime les entrées de périodes ouvertes écrites il y a plus de max_age
+        secondes (les périodes closes sont conservées indéfiniment).
+        Retourne le nombre d'entrées supprimées.
+        """
+        limit = time.time() - max_age
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) >= limit:
+                        continue
+                    with open(path, 'r', encoding='utf-8') as f:
+                        if json.load(f).get("closed"):
+                            continue
+                    os.remove(path)
+                    removed += 1
+                except (OSError, ValueError):
+                    pass
+        return removed
+
+# =======================================================
+# CLIENT
+# =======================================================
+
+class IncompleteFetch(RuntimeError):
+    """
+    Une page d'un résultat paginé n'a pas pu être récupérée (mode strict).
+    """
+
+class BSDClient:
+    """
+    Client de l'API BSD partagé par les scripts du pipeline.
+    Les appels HTTP (requests) sont exécutés dans des threads via asyncio,
+    sur une session unique qui réutilise ses connexions.
+    """
+
+    def __init__(self, token=API_TOKEN, base_url=BASE_URL, rate=REQUESTS_PER_SECOND,
+                 concurrency=None, concurrent_pages=CONCURRENT_PAGES, cache=None):
+        self.base_url = base_url
+        self.headers = {"Authorization": f"Token {token}"}
+        self.concurrency = {**ENDPOINT_CONCURRENCY, **(concurrency or {})}
+        self.concurrent_pages = concurrent_pages
+        self.limiter = TokenBucket(rate)
+        if cache is None and HTTP_CACHE_ENABLED:
+            cache = ResponseCache()
+        self.cache = cache or None
+
+        # 429 n'est pas dans status_forcelist : il est géré par le limiteur (Retry-After)
+        self.session = requests.Session()
+        retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('https://', adapter)
+
+        self._semaphores = {}
+        self._loop = None
+
+    def _semaphore(self, endpoint):
+        """
+        Sémaphore de l'endpoint pour la boucle asyncio courante.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphores = {}
+        if endpoint not in self._semaphores:
+            limit = self.concurrency.get(endpoint, DEFAULT_CONCURRENCY)
+            self._semaphores[endpoint] = asyncio.Semaphore(limit)
+        return self._semaphores[endpoint]
+
+    async def get_json(self, endpoint, params=None, refresh=False):
+        """
+        GET sur /api/<endpoint>/ ; retourne le JSON ou None en cas d'erreur.
+        Passe par le cache disque des réponses quand il est actif ; refresh=True
+        contourne le cache (requête complète, réponse non enregistrée) : pour les
+        pages lues une seule fois (rattrapage, trous, resynchronisation), qui
+        grossiraient le cache conservé en CI sans jamais être relues.
+        """
+        url = f"{self.base_url}/{endpoint}/"
+        cache = None if refresh else self.cache
+        entry = cache.get(url, params) if cache else None
+        if entry and cache.is_fresh(entry):
+            return entry["body"]
+        conditional = cache.conditional_headers(entry) if cache else {}
+
+        async with self._semaphore(endpoint):
+            for _ in range(MAX_RATE_LIMIT_RETRIES + 1):
+                await self.limiter.acquire()
+                try:
+                    resp = await asyncio.to_thread(
+                        self.session.get, url, headers={**self.headers, **conditional},
+                        params=params, timeout=TIMEOUT
+                    )
+                except Exception as e:
+                    print(f"   ❌ Exception: {e}")
+                    return None
+                if resp.status_code == 429:
+                    delay = retry_after_seconds(resp)
+                    print(f"   ⏳ Limite de débit atteinte ({endpoint}), pause de {delay:.0f}s")
+                    self.limiter.pause(delay)
+                    continue
+                if resp.status_code == 304 and entry:
+                    cache.touch(url, params, entry)
+                    return entry["body"]
+                if resp.status_code != 200:
+                    print(f"   ❌ Erreur {resp.status_code}: {resp.text[:200]}")
+                    return None
+                try:
+                    body = resp.json()
+                except ValueError:
+                    print(f"   ❌ Réponse non JSON ({endpoint}): {resp.text[:200]}")
+                    return None
+                if cache:
+                    cache.put(url, params, body, resp)
+                return body
+        print(f"   ❌ Abandon après {MAX_RATE_LIMIT_RETRIES} limitations de débit ({endpoint})")
+        return None
+
+    async def paginate(self, endpoint, params=None, refresh=False, strict=False):
+        """
+        Générateur asynchrone : produit la liste `results` de chaque page, dans l'ordre.
+        Le nombre total est lu sur la première page puis les pages restantes
+        sont demandées en même temps (dans la limite de l'endpoint).
+        refresh=True : toutes les pages sont demandées à l'API sans passer par le cache (voir get_json).
+        strict=True : lève IncompleteFetch si une page échoue, au lieu de s'arrêter
+        ou de l'ignorer (pour ne marquer une période terminée que si elle est complète).
+        """
+        params = dict(params or {})
+
+        def failed(page):
+            if strict:
+                raise IncompleteFetch(f"{endpoint} {params} : page {page} non récupérée")
+
+        print(f"   📡 Requête {endpoint} page 1...")
+        first = await self.get_json(endpoint, {**params, "page": 1}, refresh)
+        if not first:
+            failed(1)
+            return
+        results = first.get("results", [])
+        yield results
+        if first.get("next") is None:
+            return
+
+        count = first.get("count")
+        page_size = len(results)
+        if self.concurrent_pages and count and page_size:
+            nb_pages = math.ceil(count / page_size)
+            print(f"   📡 Requête {endpoint} pages 2-{nb_pages}...")
+            tasks = [
+                asyncio.ensure_future(self.get_json(endpoint, {**params, "page": page}, refresh))
+                for page in range(2, nb_pages + 1)
+            ]
+            try:
+                for page, task in enumerate(tasks, 2):
+                    data = await task
+                    if data:
+                        yield data.get("results", [])
+                    else:
+                        failed(page)
+            finally:
+                for task in tasks:
+                    task.cancel()
+            return
+
+        # Mode séquentiel : on suit les liens "next"
+        page = 2
+        while True:
+            print(f"   📡 Requête {endpoint} page {page}...")
+            data = await self.get_json(endpoint, {**params, "page": page}, refresh)
+            if not data:
+                failed(page)
+                return
+            yield data.get("results", [])
+            if data.get("next") is None:
+                return
+            page += 1
+
+    async def fetch_all(self, endpoint, params=None, refresh=False, strict=False):
+        """
+        Récupère tous les résultats d'un endpoint paginé dans une seule liste.
+        """
+        results = []
+        async for page in self.paginate(endpoint, params, refresh, strict):
+            results.extend(page)
+        return results
+
+    def fetch_all_sync(self, endpoint, params=None, refresh=False, strict=False):
+        """
+        Version synchrone de fetch_all (hors d'une boucle asyncio).
+        """
+        return asyncio.run(self.fetch_all(endpoint, params, refresh, strict))
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.prune()
+
+def date_range_params(date_from, date_to):
+    """
+    Paramètres de l'endpoint /events/ pour une période.
+    """
+    return {"date_from": date_from.isoformat(), "date_to": date_to.isoformat()}
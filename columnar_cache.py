@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+columnar_cache.py - Instantané en colonnes (.npz) de la base des matchs (cache/matches.npz)
+Rôle :
+- Exporter la table matches colonne par colonne (entiers, chaînes internées)
+- Recharger seulement les colonnes demandées (H2H, backtests...)
+- Réimporter l'instantané dans une base SQLite vide (cache CI plus léger)
+Les noms d'équipes, de ligues, les statuts et les dates sont stockés une seule fois
+dans un dictionnaire ; chaque match ne contient que des codes entiers.
+Exécution : python columnar_cache.py [export|import]
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+import match_store
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+COLUMNAR_FILE = match_store.COLUMNAR_FILE
+SCHEMA_VERSION = 1
+NULL_INT = -1   # valeur des entiers absents (scores, ids)
+
+# Colonnes entières de la table matches
+INT_COLUMNS = ["id", "home_score", "away_score", "home_team_id", "away_team_id",
+               "league_id", "team_lo", "team_hi"]
+# Colonnes texte -> dictionnaire d'internement (home_team et away_team partagent "teams")
+STRING_COLUMNS = {
+    "event_date": "event_date",
+    "status": "status",
+    "home_team": "teams",
+    "away_team": "teams",
+    "league": "leagues",
+}
+ALL_COLUMNS = ["id", "event_date", "status", "home_score", "away_score",
+               "home_team_id", "home_team", "away_team_id", "away_team",
+               "league_id", "league", "team_lo", "team_hi"]
+
+# =======================================================
+# EXPORT / CHARGEMENT
+# =======================================================
+
+def export_columnar(conn, path=COLUMNAR_FILE):
+    """
+    Écrit l'instantané en colonnes de toute la table matches.
+    Retourne le nombre de matchs exportés.
+    """
+    int_chunks = {col: [] for col in INT_COLUMNS}
+    str_chunks = {col: [] for col in STRING_COLUMNS}
+    dictionaries = {name: {} for name in set(STRING_COLUMNS.values())}
+    count = 0
+    # Lecture par lots : seules les colonnes compactes restent en mémoire
+    sql = f"SELECT {', '.join(ALL_COLUMNS)} FROM matches ORDER BY id"
+    for batch in match_store.iter_batches(conn, sql):
+        for col in INT_COLUMNS:
+            int_chunks[col].append(np.array([NULL_INT if r[col] is None else r[col] for r in batch],
+                                            dtype=np.int64))
+        for col, dict_name in STRING_COLUMNS.items():
+            values = dictionaries[dict_name]
+            str_chunks[col].append(np.array([NULL_INT if r[col] is None else values.setdefault(r[col], len(values))
+                                             for r in batch], dtype=np.int32))
+        count += len(batch)
+
+    arrays = {}
+    for col, chunks in int_chunks.items():
+        arrays[col] = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+    for col, chunks in str_chunks.items():
+        arrays[col] = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+    for dict_name, values in dictionaries.items():
+        arrays[f"{dict_name}__values"] = np.array(list(values), dtype=str)
+
+    meta = {"schema": SCHEMA_VERSION, "count": count,
+            "store_version": match_store.store_version(conn)}
+    arrays["__meta__"] = np.array(json.dumps(meta))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+    return count
+
+def read_meta(path=COLUMNAR_FILE):
+    """
+    Métadonnées de l'instantané (schéma, nombre de matchs, version de la base), ou None.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as npz:
+        return json.loads(str(npz["__meta__"]))
+
+def load_columnar(path=COLUMNAR_FILE, columns=None):
+    """
+    Charge seulement les colonnes demandées (toutes par défaut).
+    Les entiers absents valent NULL_INT ; les textes absents valent None.
+    """
+    out = {}
+    decoded = {}
+    with np.load(path, allow_pickle=False) as npz:
+        for col in columns or ALL_COLUMNS:
+            if col in STRING_COLUMNS:
+                dict_name = STRING_COLUMNS[col]
+                if dict_name not in decoded:
+                    # Le code -1 (absent) désigne le dernier élément : None
+                    decoded[dict_name] = np.asarray(npz[f"{dict_name}__values"].tolist() + [None], dtype=object)
+                out[col] = decoded[dict_name][npz[col]]
+            else:
+                out[col] = npz[col]
+    return out
+
+def import_columnar(conn, path=COLUMNAR_FILE):
+    """
+    Réimporte l'instantané dans la base (utilisé quand la base est absente).
+    """
+    meta = read_meta(path)
+    print(f"   📦 Import de l'instantané {path} ({meta['count']} matchs)...")
+    cols = load_columnar(path)
+
+    def value(col, i):
+        v = cols[col][i]
+        if col in STRING_COLUMNS:
+            return v
+        v = int(v)
+        return None if v == NULL_INT else v
+
+    rows = (tuple(value(col, i) for col in ALL_COLUMNS) for i in range(meta["count"]))
+    count = match_store.upsert_rows(conn, rows)
+    match_store.set_store_version(conn, meta["store_version"])
+    print(f"   ✅ {count} matchs importés dans la base")
+    return count
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    conn = match_store.open_store()
+    if command == "import":
+        import_columnar(conn)
+    else:
+        count = export_columnar(conn)
+        print(f"💾 {count} matchs exportés dans {COLUMNAR_FILE} ({os.path.getsize(COLUMNAR_FILE)} octets)")
+    conn.close()
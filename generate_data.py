@@ -3,7 +3,7 @@
 
 """
 generate_data.py - Script de génération du fichier data.json pour Mr XPRONOS
-Utilise le cache global all_matches.json pour les analyses H2H.
+Utilise la base locale des matchs (cache/matches.db) pour les analyses H2H.
 Rôle :
 - Récupérer les matchs d'aujourd'hui, demain, hier depuis l'API BSD
 - Obtenir les prédictions de l'API /predictions/
@@ -14,304 +14,594 @@ Rôle :
 - Inclure les données ML complètes pour les analyses VIP
 """
 
-import requests
+import asyncio
+import hashlib
 import json
-from datetime import datetime, timedelta
 import os
-import time
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import re
+import shutil
+import sys
+from datetime import datetime, timedelta
+
+import bsd_client
+import match_store
+from xpronos.analytics import (analyze_h2h, classify_match_h2h,
+                               generate_prediction_h2h, verify_prediction)
+
+try:
+    import h2h_batch
+except ImportError:  # NumPy absent : analyse H2H match par match
+    h2h_batch = None
 
 # =======================================================
 # CONFIGURATION
 # =======================================================
-API_TOKEN = os.getenv("BSD_API_TOKEN", "3d0b228fb2f078287b8e6720304f2eea2800cc6d")
-BASE_URL = "https://sports.bzzoiro.com/api"
-HEADERS = {"Authorization": f"Token {API_TOKEN}"}
-
-# Configuration des retries
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-session.mount('https://', HTTPAdapter(max_retries=retries))
-
-# Dates cibles
-today = datetime.now().date()
-tomorrow = today + timedelta(days=1)
-yesterday = today - timedelta(days=1)
-
-CACHE_DIR = "cache"
-GLOBAL_CACHE_FILE = os.path.join(CACHE_DIR, "all_matches.json")
+API_TOKEN = bsd_client.API_TOKEN
+
+DATA_FILE = "data.json"
+SHARDS_DIR = "data"       # data/<date>/<catégorie>.json + data/manifest.json
+SHARD_NAMES = ["simple", "pro", "vip", "analyses"]   # "analyses" : matchs avec données ML (VIP)
+QUEUE_SIZE = 8            # pages d'événements en attente d'analyse (file bornée)
+DATA_FORMAT_COMPACT = 2   # data.json normalisé : tables équipes/ligues, catégories en ids
+
+# Modèles d'URL des logos ("{}" = api_id) : le jeton n'est écrit qu'une fois en mode compact
+LOGO_URLS = {
+    "team": f"https://sports.bzzoiro.com/img/team/{{}}/?token={API_TOKEN}",
+    "league": f"https://sports.bzzoiro.com/img/league/{{}}/?token={API_TOKEN}",
+}
+FINGERPRINTS_FILE = os.path.join("cache", "data_fingerprints.json")
+FINGERPRINT_VERSION = 1   # à incrémenter si la construction d'une entrée change
+
+# Dates cibles (aujourd'hui, demain, hier) : fixées au lancement de main()
+_run_dates = None
+
+def set_run_date(day=None):
+    """
+    Fixe la date de génération (aujourd'hui par défaut).
+    """
+    global _run_dates
+    day = day or datetime.now().date()
+    _run_dates = (day, day + timedelta(days=1), day - timedelta(days=1))
+    return _run_dates
 
-print("="*60)
-print(f"🚀 GÉNÉRATION DES DONNÉES - {today}")
-print("="*60)
+def run_dates():
+    """
+    Dates cibles (aujourd'hui, demain, hier) de la génération en cours.
+    """
+    return _run_dates or set_run_date()
 
 # =======================================================
 # FONCTIONS DE RÉCUPÉRATION API (pour les matchs récents)
 # =======================================================
 
-def fetch_events(date_from, date_to):
-    """
-    Récupère tous les événements entre deux dates (pagination gérée).
-    Retourne une liste d'événements.
-    """
-    url = f"{BASE_URL}/events/"
-    params = {
-        "date_from": date_from.isoformat(),
-        "date_to": date_to.isoformat()
-    }
-    all_events = []
-    page = 1
-    while True:
-        params["page"] = page
-        try:
-            print(f"   📡 Requête events page {page}...")
-            resp = session.get(url, headers=HEADERS, params=params, timeout=10)
-            if resp.status_code != 200:
-                print(f"   ❌ Erreur {resp.status_code}: {resp.text}")
-                break
-            data = resp.json()
-            events = data.get("results", [])
-            all_events.extend(events)
-            print(f"      → {len(events)} événements reçus")
-            if data.get("next") is None:
-                break
-            page += 1
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"   ❌ Exception: {e}")
-            break
-    return all_events
-
-def fetch_predictions(upcoming=True):
+async def fetch_predictions(client, upcoming=True):
     """
     Récupère les prédictions de l'API.
     upcoming=True : prédictions à venir, False : prédictions passées.
     """
-    url = f"{BASE_URL}/predictions/"
     params = {"upcoming": "true" if upcoming else "false"}
-    all_predictions = []
-    page = 1
-    while True:
-        params["page"] = page
-        try:
-            print(f"   📡 Requête predictions page {page}...")
-            resp = session.get(url, headers=HEADERS, params=params, timeout=10)
-            if resp.status_code != 200:
-                print(f"   ❌ Erreur {resp.status_code}")
-                break
-            data = resp.json()
-            preds = data.get("results", [])
-            all_predictions.extend(preds)
-            if data.get("next") is None:
-                break
-            page += 1
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"   ❌ Exception: {e}")
-            break
-    return all_predictions
+    return await client.fetch_all("predictions", params)
+
+async def produce_events(client, queue, slot, day):
+    """
+    Producteur : envoie chaque page d'événements d'un jour dans la file dès sa réception.
+    """
+    count = 0
+    async for page in client.paginate("events", bsd_client.date_range_params(day, day)):
+        await queue.put((slot, page))
+        count += len(page)
+    print(f"      → {count} événements reçus ({day})")
+
+async def stream_inputs(client, is_reused=None):
+    """
+    Récupère les matchs (aujourd'hui, demain, hier) et les analyse au fil de l'eau :
+    les pages d'événements passent par une file bornée et l'analyse H2H de chaque
+    page se fait pendant que les suivantes sont téléchargées. Les prédictions ML
+    (à venir, passées) sont récupérées en parallèle, avant l'analyse de la première page.
+    is_reused(événement, prédiction) : vrai si l'entrée précédente de data.json sera
+    reprise telle quelle ; l'analyse H2H de ces événements est alors sautée.
+    Retourne (événements dans l'ordre des jours, prédictions, {id: résultat H2H}).
+    """
+    days = run_dates()
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    events_by_day = [[] for _ in days]
+    h2h_results = {}
+
+    async def consume():
+        # L'empreinte d'un match dépend de sa prédiction ML : elles sont attendues d'abord
+        # (les producteurs continuent de remplir la file pendant ce temps)
+        upcoming, past = await predictions
+        pred_dict = {p['event']['id']: p for p in upcoming + past}
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            slot, page = item
+            events_by_day[slot].extend(page)
+            if is_reused is not None:
+                page = [e for e in page if not (has_teams(e) and is_reused(e, pred_dict.get(e["id"])))]
+            h2h_results.update(analyze_page_h2h(page))
+
+    async def produce():
+        await asyncio.gather(*(produce_events(client, queue, slot, day)
+                               for slot, day in enumerate(days)))
+        await queue.put(None)
+
+    predictions = asyncio.gather(fetch_predictions(client, upcoming=True),
+                                 fetch_predictions(client, upcoming=False))
+    producers = asyncio.ensure_future(produce())
+    consumer = asyncio.ensure_future(consume())
+    try:
+        # Si l'analyse échoue, les producteurs resteraient bloqués sur la file pleine :
+        # on s'arrête à la première exception, d'un côté comme de l'autre
+        done, _ = await asyncio.wait({producers, consumer}, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            task.result()
+        predictions_upcoming, predictions_past = await predictions
+    except BaseException:
+        for task in (producers, consumer, predictions):
+            task.cancel()
+        raise
+
+    all_events = [e for day_events in events_by_day for e in day_events]
+    return all_events, predictions_upcoming + predictions_past, h2h_results
 
 # =======================================================
-# FONCTIONS D'ANALYSE H2H (UTILISANT LE CACHE GLOBAL)
+# FONCTIONS D'ANALYSE H2H (UTILISANT LA BASE LOCALE)
 # =======================================================
 
+_store = None
+
+def set_store(conn):
+    """
+    Utilise une base déjà ouverte (pipeline.py) au lieu d'en ouvrir une.
+    """
+    global _store, _h2h_history
+    _store = conn
+    _h2h_history = None
+
+def get_store():
+    """
+    Ouvre la base des matchs une seule fois par exécution.
+    """
+    global _store
+    if _store is None:
+        if not match_store.store_exists():
+            print("   ⚠️ Base des matchs introuvable. Veuillez d'abord exécuter allmatches.py")
+        _store = match_store.open_store()
+    return _store
+
 def get_h2h_from_cache(team_id_a, team_id_b):
     """
-    Récupère l'historique des confrontations entre deux équipes depuis le cache global.
+    Récupère l'historique des confrontations entre deux équipes depuis la base locale.
     Retourne une liste de matchs triée par date décroissante.
     """
-    if not os.path.exists(GLOBAL_CACHE_FILE):
-        print("   ⚠️ Cache global introuvable. Veuillez d'abord exécuter allmatches.py")
-        return []
-
-    with open(GLOBAL_CACHE_FILE, 'r', encoding='utf-8') as f:
-        all_matches = json.load(f)
-
-    h2h = []
-    for m in all_matches:
-        home_obj = m.get("home_team_obj")
-        away_obj = m.get("away_team_obj")
-        if home_obj and away_obj:
-            if (home_obj["id"] == team_id_a and away_obj["id"] == team_id_b) or \
-               (home_obj["id"] == team_id_b and away_obj["id"] == team_id_a):
-                # On ne garde que les matchs terminés avec scores
-                if m["status"] == "finished" and m["home_score"] is not None and m["away_score"] is not None:
-                    h2h.append({
-                        "date": m["event_date"],
-                        "home_team": home_obj["name"],
-                        "away_team": away_obj["name"],
-                        "home_score": m["home_score"],
-                        "away_score": m["away_score"],
-                        "status": m["status"],
-                        "league": m["league"]["name"]
-                    })
-    # Trier par date décroissante
-    h2h.sort(key=lambda x: x["date"], reverse=True)
-    return h2h
-
-def analyze_h2h(h2h_list, current_home_team, current_away_team):
-    """
-    Analyse la liste H2H pour déterminer :
-    - Nombre total de matchs
-    - Victoires domicile/extérieur/nuls
-    - Moyenne de buts
-    - Les 4 derniers matchs (filtrés pour ne garder que les terminés)
-    """
-    home_wins = 0
-    away_wins = 0
-    draws = 0
-    total_goals = 0
-    matches_count = 0
-
-    # Les 4 derniers matchs terminés
-    last_4 = h2h_list[:4]
-
-    for match in h2h_list:
-        matches_count += 1
-        total_goals += match["home_score"] + match["away_score"]
-        if match["home_score"] > match["away_score"]:
-            if match["home_team"] == current_home_team:
-                home_wins += 1
-            else:
-                away_wins += 1
-        elif match["home_score"] < match["away_score"]:
-            if match["away_team"] == current_home_team:
-                home_wins += 1
-            else:
-                away_wins += 1
-        else:
-            draws += 1
+    return match_store.get_h2h(get_store(), team_id_a, team_id_b)
 
-    goals_avg = total_goals / matches_count if matches_count > 0 else 0
-    return {
-        "total_matches": matches_count,
-        "home_wins": home_wins,
-        "away_wins": away_wins,
-        "draws": draws,
-        "goals_avg": goals_avg,
-        "last_4": last_4
-    }
+_h2h_history = None
+
+def load_h2h_history():
+    """
+    Charge l'historique H2H en colonnes : depuis l'instantané matches.npz s'il
+    correspond à la version de la base, sinon depuis SQLite.
+    """
+    import columnar_cache
+    meta = columnar_cache.read_meta(match_store.COLUMNAR_FILE)
+    if meta and meta["store_version"] == match_store.store_version(get_store()):
+        history = h2h_batch.H2HHistory.from_columnar(match_store.COLUMNAR_FILE)
+        source = "instantané .npz"
+    else:
+        history = h2h_batch.H2HHistory.from_store(get_store())
+        source = "base SQLite"
+    print(f"   📦 Historique H2H chargé en colonnes ({source}) : {len(history)} matchs")
+    return history
+
+def analyze_h2h_batch(events):
+    """
+    Analyse H2H de plusieurs événements en une passe vectorisée (h2h_batch).
+    Retourne {id d'événement: (analyse, pronostic, catégorie)},
+    ou {} si NumPy n'est pas disponible (analyse match par match).
+    """
+    global _h2h_history
+    if h2h_batch is None or not events:
+        return {}
+    if _h2h_history is None:
+        _h2h_history = load_h2h_history()
+    fixtures = [(e["home_team_obj"]["id"], e["away_team_obj"]["id"],
+                 e["home_team_obj"]["name"], e["away_team_obj"]["name"]) for e in events]
+    results = h2h_batch.analyze_fixtures(_h2h_history, fixtures)
+    return {e["id"]: r for e, r in zip(events, results)}
+
+def has_teams(event):
+    """
+    Indique si l'événement a ses deux équipes (sinon il est ignoré).
+    """
+    return bool(event.get("home_team_obj") and event.get("away_team_obj"))
+
+def analyze_page_h2h(events):
+    """
+    Analyse H2H d'une page d'événements : moteur vectorisé si disponible,
+    sinon match par match. Retourne {id d'événement: (analyse, pronostic, catégorie)}.
+    """
+    events = [e for e in events if has_teams(e)]
+    results = analyze_h2h_batch(events)
+    for event in events:
+        if event["id"] not in results:
+            home, away = event["home_team_obj"], event["away_team_obj"]
+            analysis = analyze_h2h(get_h2h_from_cache(home["id"], away["id"]), home["name"], away["name"])
+            results[event["id"]] = (analysis,
+                                    generate_prediction_h2h(analysis, home["name"], away["name"]),
+                                    classify_match_h2h(analysis))
+    return results
+
+# =======================================================
+# CONSTRUCTION D'UNE ENTRÉE DE data.json
+# =======================================================
 
-def classify_match_h2h(analysis):
-    """
-    Classification :
-    - Si au moins 4 matchs H2H et une équipe a gagné 3 ou 4 fois → VIP
-    - Si au moins 5 matchs H2H et une équipe a gagné au moins N-1 fois → VIP
-    - Sinon → Simple
-    """
-    n = analysis["total_matches"]
-    if n >= 4:
-        if analysis["home_wins"] >= 3 or analysis["away_wins"] >= 3:
-            return "vip"
-    if n >= 5:
-        if analysis["home_wins"] >= n-1 or analysis["away_wins"] >= n-1:
-            return "vip"
-    return "simple"
-
-def generate_prediction_h2h(analysis, home_team, away_team):
-    """
-    Génère un pronostic simple basé sur les 4 derniers H2H terminés.
-    Retourne un dictionnaire avec double_chance, over_25, confidence.
-    """
-    last_4 = analysis["last_4"]
-    home_wins_last4 = 0
-    away_wins_last4 = 0
-    draws_last4 = 0
-    goals_last4 = []
-
-    for m in last_4:
-        goals_last4.append(m["home_score"] + m["away_score"])
-        if m["home_score"] > m["away_score"]:
-            if m["home_team"] == home_team:
-                home_wins_last4 += 1
+def build_match_data(event, ml_pred, h2h_result=None):
+    """
+    Construit l'entrée data.json d'un événement : analyse H2H, pronostic
+    (ML si disponible et tranché, sinon H2H), catégorie et vérification (hier).
+    h2h_result : (analyse, pronostic, catégorie) déjà calculés par le moteur vectorisé.
+    """
+    match_id = event["id"]
+    home_team_obj = event["home_team_obj"]
+    away_team_obj = event["away_team_obj"]
+    league = event["league"]
+    event_date = event["event_date"][:10]
+    event_datetime = event["event_date"]
+
+    print(f"   {home_team_obj['name']} vs {away_team_obj['name']} ({league['name']})")
+
+    if h2h_result is not None:
+        analysis_h2h, prediction_h2h, category_h2h = h2h_result
+    else:
+        h2h = get_h2h_from_cache(home_team_obj["id"], away_team_obj["id"])
+        analysis_h2h = analyze_h2h(h2h, home_team_obj["name"], away_team_obj["name"])
+        prediction_h2h = generate_prediction_h2h(analysis_h2h, home_team_obj["name"], away_team_obj["name"])
+        category_h2h = classify_match_h2h(analysis_h2h)
+    print(f"   → {analysis_h2h['total_matches']} confrontations H2H trouvées dans la base")
+
+    if analysis_h2h["home_wins"] > analysis_h2h["away_wins"]:
+        prediction_h2h["confidence"] = min(prediction_h2h["confidence"] + 10, 100)
+
+    ml_full = None
+    if ml_pred:
+        # Sauvegarder toutes les données ML pour les analyses VIP
+        ml_full = {
+            "prob_home_win": ml_pred.get('prob_home_win'),
+            "prob_draw": ml_pred.get('prob_draw'),
+            "prob_away_win": ml_pred.get('prob_away_win'),
+            "predicted_result": ml_pred.get('predicted_result'),
+            "expected_home_goals": ml_pred.get('expected_home_goals'),
+            "expected_away_goals": ml_pred.get('expected_away_goals'),
+            "prob_over_25": ml_pred.get('prob_over_25'),
+            "over_25_recommend": ml_pred.get('over_25_recommend'),
+            "prob_btts_yes": ml_pred.get('prob_btts_yes'),
+            "btts_recommend": ml_pred.get('btts_recommend'),
+            "most_likely_score": ml_pred.get('most_likely_score'),
+            "favorite": ml_pred.get('favorite'),
+            "favorite_prob": ml_pred.get('favorite_prob'),
+            "confidence": ml_pred.get('confidence')
+        }
+
+        prob_home = ml_pred.get('prob_home_win', 0)
+        prob_away = ml_pred.get('prob_away_win', 0)
+        predicted_result = ml_pred.get('predicted_result', '')
+        if prob_home > 55 or prob_away > 55:
+            if predicted_result == "H":
+                double_chance_ml = "1X"
+            elif predicted_result == "A":
+                double_chance_ml = "X2"
             else:
-                away_wins_last4 += 1
-        elif m["home_score"] < m["away_score"]:
-            if m["away_team"] == home_team:
-                home_wins_last4 += 1
+                double_chance_ml = "12"
+            over_25_ml = ml_pred.get('over_25_recommend', False)
+            raw_confidence = ml_pred.get('confidence', 0.5)
+            if raw_confidence <= 1:
+                confidence_ml = round(raw_confidence * 100, 1)
             else:
-                away_wins_last4 += 1
+                confidence_ml = round(raw_confidence, 1)
+            prediction_ml = {
+                "double_chance": double_chance_ml,
+                "over_25": over_25_ml,
+                "confidence": confidence_ml,
+                "source": "ML"
+            }
+            category = "pro"
+            prediction_used = prediction_ml
         else:
-            draws_last4 += 1
-
-    # Double chance
-    if home_wins_last4 > away_wins_last4 + draws_last4:
-        double_chance = "1X"
-    elif away_wins_last4 > home_wins_last4 + draws_last4:
-        double_chance = "X2"
+            category = category_h2h
+            prediction_used = prediction_h2h
     else:
-        double_chance = "12"
+        category = category_h2h
+        prediction_used = prediction_h2h
+
+    home_logo = LOGO_URLS["team"].format(home_team_obj['api_id'])
+    away_logo = LOGO_URLS["team"].format(away_team_obj['api_id'])
+    league_logo = LOGO_URLS["league"].format(league['api_id'])
+
+    match_data = {
+        "id": match_id,
+        "date": event_date,
+        "event_date": event_datetime,
+        "home_team": home_team_obj["name"],
+        "away_team": away_team_obj["name"],
+        "home_logo": home_logo,
+        "away_logo": away_logo,
+        "league": league["name"],
+        "league_logo": league_logo,
+        "venue": event.get("venue", ""),
+        "status": event["status"],
+        "home_score": event["home_score"],
+        "away_score": event["away_score"],
+        "h2h_analysis": analysis_h2h,
+        "prediction": prediction_used,
+        "category": category,
+        "verified_double": False,
+        "verified_over": False,
+        "ml_full": ml_full  # Données ML complètes pour analyses VIP
+    }
 
-    # Over/Under 2.5
-    avg_goals = sum(goals_last4) / len(goals_last4) if goals_last4 else 2.5
-    over_25 = avg_goals > 2.5
+    if event_date == run_dates()[2].isoformat():
+        verify_prediction(match_data, prediction_used)
+        if match_data["verified_double"] or match_data["verified_over"]:
+            print(f"   ✅ Vérification : Double chance {'OK' if match_data['verified_double'] else 'KO'}, Over {'OK' if match_data['verified_over'] else 'KO'}")
 
-    # Confiance basée sur le nombre de matchs analysés (max 95)
-    confidence = 50 + (analysis["total_matches"] * 5)
-    confidence = min(confidence, 95)
+    print(f"   ✅ Catégorie: {category}, Confiance: {prediction_used['confidence']}%")
+    return match_data
 
-    return {
-        "double_chance": double_chance,
-        "over_25": over_25,
-        "confidence": confidence
+# =======================================================
+# RÉGÉNÉRATION INCRÉMENTALE (EMPREINTES PAR MATCH)
+# =======================================================
+
+def match_fingerprint(event, ml_pred, h2h_version):
+    """
+    Empreinte des entrées d'un match : statut, scores, prédiction ML,
+    version de la base H2H et vérification (le match est-il d'hier ?).
+    Si elle n'a pas changé, l'entrée précédente de data.json est réutilisée.
+    """
+    payload = {
+        "v": FINGERPRINT_VERSION,
+        "event_date": event["event_date"],
+        "status": event.get("status"),
+        "home_score": event.get("home_score"),
+        "away_score": event.get("away_score"),
+        "home_team": event["home_team_obj"],
+        "away_team": event["away_team_obj"],
+        "league": event.get("league"),
+        "venue": event.get("venue", ""),
+        "prediction": ml_pred,
+        "h2h_version": h2h_version,
+        "verify": event["event_date"][:10] == run_dates()[2].isoformat(),
+        "token": API_TOKEN,
     }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def load_previous_matches(path=DATA_FILE):
+    """
+    Entrées de la précédente génération, indexées par id d'événement.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {m["id"]: m for m in expand_data(previous).get("matches", [])}
+
+def load_fingerprints(path=FINGERPRINTS_FILE):
+    """
+    Empreintes de la précédente génération ({id: empreinte}).
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {int(k): v for k, v in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+def save_fingerprints(fingerprints, path=FINGERPRINTS_FILE):
+    """
+    Sauvegarde les empreintes de cette génération.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({str(k): v for k, v in fingerprints.items()}, f)
 
 # =======================================================
-# FONCTIONS DE VÉRIFICATION DES MATCHS D'HIER
+# FORMAT COMPACT DE data.json
 # =======================================================
 
-def verify_prediction(match, prediction):
+def _logo_entry(url, kind):
     """
-    Vérifie si le pronostic (double chance et over 2.5) est validé par le résultat réel.
+    Réduit une URL de logo à son api_id si elle suit le modèle LOGO_URLS[kind].
     """
-    match['verified_double'] = False
-    match['verified_over'] = False
+    prefix, suffix = LOGO_URLS[kind].split("{}")
+    if url and url.startswith(prefix) and url.endswith(suffix):
+        return {"logo": url[len(prefix):len(url) - len(suffix)]}
+    return {"logo_url": url}
 
-    if match['status'] != 'finished':
-        return
+def _logo_url(entry, kind):
+    if "logo_url" in entry:
+        return entry["logo_url"]
+    return LOGO_URLS[kind].format(entry["logo"])
 
-    home_score = match['home_score']
-    away_score = match['away_score']
-    if home_score is None or away_score is None:
-        return
+def compact_data(data):
+    """
+    Format compact (normalisé) de data.json :
+    - équipes et ligues écrites une seule fois dans des tables de correspondance
+    - matchs référençant ces tables par index
+    - catégories réduites à des listes d'ids de matchs
+    """
+    teams, team_index = [], {}
+    leagues, league_index = [], {}
+
+    def intern(table, index, name, logo, kind):
+        key = (name, logo)
+        if key not in index:
+            index[key] = len(table)
+            table.append({"name": name, **_logo_entry(logo, kind)})
+        return index[key]
+
+    matches = []
+    for m in data["matches"]:
+        compact = {k: v for k, v in m.items()
+                   if k not in ("home_team", "away_team", "home_logo", "away_logo", "league", "league_logo")}
+        compact["home"] = intern(teams, team_index, m["home_team"], m["home_logo"], "team")
+        compact["away"] = intern(teams, team_index, m["away_team"], m["away_logo"], "team")
+        compact["league"] = intern(leagues, league_index, m["league"], m["league_logo"], "league")
+        matches.append(compact)
 
-    total_goals = home_score + away_score
+    return {
+        "format": DATA_FORMAT_COMPACT,
+        "logo_urls": LOGO_URLS,
+        "teams": teams,
+        "leagues": leagues,
+        "matches": matches,
+        "categories": {cat: [m["id"] for m in lst] for cat, lst in data["categories"].items()},
+        "bookmakers": data["bookmakers"],
+    }
 
-    dc = prediction.get('double_chance', '')
-    if dc == '1X':
-        match['verified_double'] = (home_score > away_score) or (home_score == away_score)
-    elif dc == 'X2':
-        match['verified_double'] = (home_score == away_score) or (home_score < away_score)
-    elif dc == '12':
-        match['verified_double'] = (home_score > away_score) or (home_score < away_score)
+def expand_data(doc):
+    """
+    Inverse de compact_data : retourne un document au format complet
+    (un document déjà complet est retourné tel quel).
+    """
+    if doc.get("format") != DATA_FORMAT_COMPACT:
+        return doc
+    teams, leagues = doc["teams"], doc["leagues"]
+    matches = []
+    for m in doc["matches"]:
+        full = {k: v for k, v in m.items() if k not in ("home", "away", "league")}
+        home, away, league = teams[m["home"]], teams[m["away"]], leagues[m["league"]]
+        full.update({
+            "home_team": home["name"],
+            "away_team": away["name"],
+            "home_logo": _logo_url(home, "team"),
+            "away_logo": _logo_url(away, "team"),
+            "league": league["name"],
+            "league_logo": _logo_url(league, "league"),
+        })
+        matches.append(full)
+    by_id = {m["id"]: m for m in matches}
+    categories = {cat: [by_id[i] for i in ids if i in by_id] for cat, ids in doc["categories"].items()}
+    return {"matches": matches, "categories": categories, "bookmakers": doc["bookmakers"]}
+
+def write_data(data, path=DATA_FILE, compact=False):
+    """
+    Écrit data.json : format complet indenté, ou format compact minifié.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        if compact:
+            json.dump(compact_data(data), f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(data, f, indent=2, ensure_ascii=False)
 
-    if prediction.get('over_25'):
-        match['verified_over'] = total_goals > 2.5
-    else:
-        match['verified_over'] = total_goals <= 2.5
+# =======================================================
+# SORTIE EN SHARDS (PAR JOUR ET PAR CATÉGORIE)
+# =======================================================
+
+def _write_if_changed(path, payload):
+    """
+    Écrit le fichier seulement si son contenu change (le cache navigateur reste valide).
+    """
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == payload:
+                return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(payload)
+    return True
+
+def write_shards(data, directory=SHARDS_DIR):
+    """
+    Écrit un shard compact par jour et par catégorie (data/<date>/<catégorie>.json),
+    ainsi qu'un petit manifeste (data/manifest.json) avec le hash et le nombre
+    de matchs de chaque shard. Le navigateur ne télécharge que ce qu'il affiche.
+    """
+    by_day = {}
+    for m in data["matches"]:
+        day = by_day.setdefault(m["date"], {name: [] for name in SHARD_NAMES})
+        day[m["category"]].append(m)
+        if m.get("ml_full"):
+            day["analyses"].append(m)
+
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "bookmakers": data["bookmakers"],
+        "shards": {},
+    }
+    written = 0
+    for day, shards in sorted(by_day.items()):
+        manifest["shards"][day] = {}
+        for name, matches in shards.items():
+            doc = compact_data({"matches": matches, "categories": {name: matches}, "bookmakers": []})
+            payload = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            path = os.path.join(directory, day, f"{name}.json")
+            written += _write_if_changed(path, payload)
+            manifest["shards"][day][name] = {
+                "path": path.replace(os.sep, "/"),
+                "hash": hashlib.sha256(payload).hexdigest()[:16],
+                "count": len(matches),
+            }
+
+    # Suppression des jours qui ne sont plus publiés
+    if os.path.isdir(directory):
+        for entry in os.listdir(directory):
+            if re.fullmatch(r"\d{4}-\d{2}-\d{2}", entry) and entry not in by_day:
+                shutil.rmtree(os.path.join(directory, entry))
+
+    payload = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _write_if_changed(os.path.join(directory, "manifest.json"), payload)
+    print(f"💾 {sum(len(s) for s in manifest['shards'].values())} shards ({written} modifiés) dans {directory}/")
 
 # =======================================================
 # FONCTION PRINCIPALE
 # =======================================================
 
-def main():
-    print("\n📅 Récupération des matchs du jour, demain, hier...")
-    events_today = fetch_events(today, today)
-    events_tomorrow = fetch_events(tomorrow, tomorrow)
-    events_yesterday = fetch_events(yesterday, yesterday)
+def main(compact=False, shards=False, client=None, conn=None):
+    """
+    compact=True : data.json au format compact (normalisé et minifié).
+    shards=True  : écrit aussi les shards par jour/catégorie et leur manifeste.
+    client, conn : client API et base déjà ouverts (pipeline.py), sinon créés ici.
+    """
+    today, _, _ = set_run_date()
+    print("="*60)
+    print(f"🚀 GÉNÉRATION DES DONNÉES - {today}")
+    print("="*60)
+    if conn is not None:
+        set_store(conn)
+
+    print("\n📅 Récupération des matchs du jour, demain, hier et des prédictions ML...")
+    # Les récupérations se chevauchent sur la session partagée du client,
+    # et l'analyse H2H de chaque page se fait pendant le téléchargement des suivantes
+    # Régénération incrémentale : seules les entrées dont l'empreinte a changé sont
+    # recalculées (et seuls ces matchs passent par l'analyse H2H)
+    previous_matches = load_previous_matches()
+    previous_fingerprints = load_fingerprints()
+    h2h_version = match_store.store_version(get_store())
+
+    def is_reused(event, ml_pred):
+        match_id = event["id"]
+        return (match_id in previous_matches and
+                previous_fingerprints.get(match_id) == match_fingerprint(event, ml_pred, h2h_version))
+
+    own_client = client is None
+    client = client or bsd_client.BSDClient()
+    all_events, all_predictions, h2h_results = asyncio.run(stream_inputs(client, is_reused))
+    if own_client:
+        client.close()
 
-    all_events = events_today + events_tomorrow + events_yesterday
     print(f"\n✅ Total événements récupérés : {len(all_events)}")
 
     if len(all_events) == 0:
         print("❌ Aucun événement récupéré. Conservation de l'ancien fichier.")
         return
 
-    print("\n📈 Récupération des prédictions ML...")
-    predictions_upcoming = fetch_predictions(upcoming=True)
-    predictions_past = fetch_predictions(upcoming=False)
-    all_predictions = predictions_upcoming + predictions_past
     print(f"✅ {len(all_predictions)} prédictions récupérées")
 
     pred_dict = {p['event']['id']: p for p in all_predictions}
@@ -329,121 +619,46 @@ def main():
         ]
     }
 
-    for idx, event in enumerate(all_events, 1):
-        print(f"\n🔍 Analyse match {idx}/{len(all_events)}")
+    fingerprints = {}
+    reused = 0
+
+    plan = []
+    for event in all_events:
         match_id = event["id"]
-        home_team_obj = event.get("home_team_obj")
-        away_team_obj = event.get("away_team_obj")
-        if not home_team_obj or not away_team_obj:
-            print("   ⚠️  Équipes manquantes, ignoré")
+        if not has_teams(event):
+            plan.append((event, None, None))
             continue
-
-        league = event["league"]
-        event_date = event["event_date"][:10]
-        event_datetime = event["event_date"]
-
-        print(f"   {home_team_obj['name']} vs {away_team_obj['name']} ({league['name']})")
-
-        h2h = get_h2h_from_cache(home_team_obj["id"], away_team_obj["id"])
-        print(f"   → {len(h2h)} confrontations H2H trouvées dans le cache")
-
-        analysis_h2h = analyze_h2h(h2h, home_team_obj["name"], away_team_obj["name"])
-        prediction_h2h = generate_prediction_h2h(analysis_h2h, home_team_obj["name"], away_team_obj["name"])
-
-        if analysis_h2h["home_wins"] > analysis_h2h["away_wins"]:
-            prediction_h2h["confidence"] = min(prediction_h2h["confidence"] + 10, 100)
-
         ml_pred = pred_dict.get(match_id)
-        ml_full = None
-        if ml_pred:
-            # Sauvegarder toutes les données ML pour les analyses VIP
-            ml_full = {
-                "prob_home_win": ml_pred.get('prob_home_win'),
-                "prob_draw": ml_pred.get('prob_draw'),
-                "prob_away_win": ml_pred.get('prob_away_win'),
-                "predicted_result": ml_pred.get('predicted_result'),
-                "expected_home_goals": ml_pred.get('expected_home_goals'),
-                "expected_away_goals": ml_pred.get('expected_away_goals'),
-                "prob_over_25": ml_pred.get('prob_over_25'),
-                "over_25_recommend": ml_pred.get('over_25_recommend'),
-                "prob_btts_yes": ml_pred.get('prob_btts_yes'),
-                "btts_recommend": ml_pred.get('btts_recommend'),
-                "most_likely_score": ml_pred.get('most_likely_score'),
-                "favorite": ml_pred.get('favorite'),
-                "favorite_prob": ml_pred.get('favorite_prob'),
-                "confidence": ml_pred.get('confidence')
-            }
-
-            prob_home = ml_pred.get('prob_home_win', 0)
-            prob_away = ml_pred.get('prob_away_win', 0)
-            predicted_result = ml_pred.get('predicted_result', '')
-            if prob_home > 55 or prob_away > 55:
-                if predicted_result == "H":
-                    double_chance_ml = "1X"
-                elif predicted_result == "A":
-                    double_chance_ml = "X2"
-                else:
-                    double_chance_ml = "12"
-                over_25_ml = ml_pred.get('over_25_recommend', False)
-                raw_confidence = ml_pred.get('confidence', 0.5)
-                if raw_confidence <= 1:
-                    confidence_ml = round(raw_confidence * 100, 1)
-                else:
-                    confidence_ml = round(raw_confidence, 1)
-                prediction_ml = {
-                    "double_chance": double_chance_ml,
-                    "over_25": over_25_ml,
-                    "confidence": confidence_ml,
-                    "source": "ML"
-                }
-                category = "pro"
-                prediction_used = prediction_ml
-            else:
-                category = classify_match_h2h(analysis_h2h)
-                prediction_used = prediction_h2h
+        fingerprint = match_fingerprint(event, ml_pred, h2h_version)
+        fingerprints[match_id] = fingerprint
+        if previous_fingerprints.get(match_id) == fingerprint and match_id in previous_matches:
+            plan.append((event, ml_pred, previous_matches[match_id]))
         else:
-            category = classify_match_h2h(analysis_h2h)
-            prediction_used = prediction_h2h
+            plan.append((event, ml_pred, None))
 
-        home_logo = f"https://sports.bzzoiro.com/img/team/{home_team_obj['api_id']}/?token={API_TOKEN}"
-        away_logo = f"https://sports.bzzoiro.com/img/team/{away_team_obj['api_id']}/?token={API_TOKEN}"
-        league_logo = f"https://sports.bzzoiro.com/img/league/{league['api_id']}/?token={API_TOKEN}"
-
-        match_data = {
-            "id": match_id,
-            "date": event_date,
-            "event_date": event_datetime,
-            "home_team": home_team_obj["name"],
-            "away_team": away_team_obj["name"],
-            "home_logo": home_logo,
-            "away_logo": away_logo,
-            "league": league["name"],
-            "league_logo": league_logo,
-            "venue": event.get("venue", ""),
-            "status": event["status"],
-            "home_score": event["home_score"],
-            "away_score": event["away_score"],
-            "h2h_analysis": analysis_h2h,
-            "prediction": prediction_used,
-            "category": category,
-            "verified_double": False,
-            "verified_over": False,
-            "ml_full": ml_full  # Données ML complètes pour analyses VIP
-        }
+    for idx, (event, ml_pred, previous) in enumerate(plan, 1):
+        print(f"\n🔍 Analyse match {idx}/{len(all_events)}")
+        if not has_teams(event):
+            print("   ⚠️  Équipes manquantes, ignoré")
+            continue
 
-        if event_date == yesterday.isoformat():
-            verify_prediction(match_data, prediction_used)
-            if match_data["verified_double"] or match_data["verified_over"]:
-                print(f"   ✅ Vérification : Double chance {'OK' if match_data['verified_double'] else 'KO'}, Over {'OK' if match_data['verified_over'] else 'KO'}")
+        if previous is not None:
+            match_data = previous
+            reused += 1
+            print(f"   ♻️  Inchangé depuis la dernière génération ({match_data['category']})")
+        else:
+            match_data = build_match_data(event, ml_pred, h2h_results.get(event["id"]))
 
         data["matches"].append(match_data)
-        data["categories"][category].append(match_data)
+        data["categories"][match_data["category"]].append(match_data)
 
-        print(f"   ✅ Catégorie: {category}, Confiance: {prediction_used['confidence']}%")
+    print(f"\n♻️  {reused}/{len(fingerprints)} matchs repris de la génération précédente")
 
-    with open("data.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    write_data(data, compact=compact)
+    save_fingerprints(fingerprints)
     print("\n💾 Fichier data.json généré avec succès !")
+    if shards:
+        write_shards(data)
 
 if __name__ == "__main__":
-    main()
+    main(compact="--compact" in sys.argv, shards="--shards" in sys.argv)
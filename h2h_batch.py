@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+h2h_batch.py - Moteur d'analyse H2H vectorisé (NumPy)
+Analyse toutes les rencontres à venir en une seule passe sur l'historique en colonnes,
+au lieu de boucler en Python match par match.
+Donne les mêmes résultats que analyze_h2h(), generate_prediction_h2h()
+et classify_match_h2h() de xpronos/analytics.py :
+- victoires domicile/extérieur (par nom d'équipe, comme analyze_h2h), nuls, moyenne de buts
+- tendance des 4 derniers matchs : double chance, over 2.5
+- confiance et catégorie (simple / vip)
+"""
+
+import numpy as np
+
+# Colonnes de l'historique utilisées par le moteur
+HISTORY_COLUMNS = ["id", "event_date", "home_team", "away_team", "home_score",
+                   "away_score", "league", "team_lo", "team_hi"]
+
+# =======================================================
+# HISTORIQUE EN COLONNES
+# =======================================================
+
+def pair_keys(team_lo, team_hi):
+    """
+    Clé entière d'une paire d'équipes (lo, hi) pour la recherche par tri.
+    """
+    return (np.asarray(team_lo, dtype=np.int64) << 32) | np.asarray(team_hi, dtype=np.int64)
+
+class H2HHistory:
+    """
+    Historique des matchs terminés, en colonnes, trié par (paire, date décroissante, id).
+    Chaque paire d'équipes occupe ainsi une plage contiguë des tableaux.
+    """
+
+    def __init__(self, columns):
+        ids = np.asarray(columns["id"], dtype=np.int64)
+        dates = np.asarray(columns["event_date"], dtype=object)
+        keys = pair_keys(columns["team_lo"], columns["team_hi"])
+
+        # Rang de chaque date dans l'ordre des chaînes (même tri que la requête SQL)
+        _, date_rank = np.unique(dates.astype(str), return_inverse=True)
+        order = np.lexsort((ids, -date_rank, keys))
+
+        # Noms d'équipes internés : les victoires sont comparées par code entier
+        names = np.concatenate([np.asarray(columns["home_team"], dtype=object),
+                                np.asarray(columns["away_team"], dtype=object)]).astype(str)
+        self.team_names, codes = np.unique(names, return_inverse=True)
+        self.name_codes = {name: code for code, name in enumerate(self.team_names.tolist())}
+        n = len(ids)
+
+        self.keys = keys[order]
+        self.dates = dates[order]
+        self.home_code = codes[:n][order]
+        self.away_code = codes[n:][order]
+        self.home_score = np.asarray(columns["home_score"], dtype=np.int64)[order]
+        self.away_score = np.asarray(columns["away_score"], dtype=np.int64)[order]
+        self.leagues = np.asarray(columns["league"], dtype=object)[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_store(cls, conn):
+        """
+        Charge les colonnes nécessaires depuis la base SQLite (matchs terminés avec scores).
+        Les lignes sont lues par lots et converties aussitôt en tableaux.
+        """
+        import match_store
+        chunks = {name: [] for name in HISTORY_COLUMNS}
+        for batch in match_store.iter_batches(conn, f"""
+            SELECT {", ".join(HISTORY_COLUMNS)}
+            FROM matches
+            WHERE status = 'finished'
+              AND home_score IS NOT NULL AND away_score IS NOT NULL
+              AND team_lo IS NOT NULL AND team_hi IS NOT NULL
+        """):
+            for i, name in enumerate(HISTORY_COLUMNS):
+                chunks[name].append(np.array([r[i] for r in batch], dtype=object))
+        columns = {name: np.concatenate(parts) if parts else np.zeros(0, dtype=object)
+                   for name, parts in chunks.items()}
+        return cls(columns)
+
+    @classmethod
+    def from_columnar(cls, path):
+        """
+        Charge les colonnes nécessaires depuis l'instantané matches.npz (columnar_cache.py),
+        sans passer par SQLite.
+        """
+        import columnar_cache
+        cols = columnar_cache.load_columnar(path, HISTORY_COLUMNS + ["status"])
+        null = columnar_cache.NULL_INT
+        keep = ((cols["status"] == "finished")
+                & (cols["home_score"] != null) & (cols["away_score"] != null)
+                & (cols["team_lo"] != null) & (cols["team_hi"] != null))
+        return cls({name: cols[name][keep] for name in HISTORY_COLUMNS})
+
+    def last_matches(self, start, count):
+        """
+        Matchs [start, start+count) au format des listes H2H (match_store.get_h2h).
+        """
+        return [{
+            "date": self.dates[i],
+            "home_team": str(self.team_names[self.home_code[i]]),
+            "away_team": str(self.team_names[self.away_code[i]]),
+            "home_score": int(self.home_score[i]),
+            "away_score": int(self.away_score[i]),
+            "status": "finished",
+            "league": self.leagues[i]
+        } for i in range(start, start + count)]
+
+# =======================================================
+# ANALYSE VECTORISÉE
+# =======================================================
+
+def analyze_fixtures(history, fixtures):
+    """
+    Analyse H2H de toutes les rencontres en une passe.
+    fixtures : liste de (home_id, away_id, home_name, away_name).
+    Retourne une liste de (analysis, prediction, category) alignée sur fixtures,
+    identique à analyze_h2h / generate_prediction_h2h / classify_match_h2h.
+    """
+    nb = len(fixtures)
+    if nb == 0:
+        return []
+    home_ids = np.array([f[0] for f in fixtures], dtype=np.int64)
+    away_ids = np.array([f[1] for f in fixtures], dtype=np.int64)
+    keys = pair_keys(np.minimum(home_ids, away_ids), np.maximum(home_ids, away_ids))
+    fixture_home_code = np.array([history.name_codes.get(f[2], -1) for f in fixtures], dtype=np.int64)
+
+    # Plage [start, end) de chaque paire dans l'historique trié
+    start = np.searchsorted(history.keys, keys, side="left")
+    end = np.searchsorted(history.keys, keys, side="right")
+    counts = end - start
+
+    # Une ligne par (rencontre, match H2H) ; position = rang du match dans la paire
+    fixture_idx = np.repeat(np.arange(nb), counts)
+    position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows = np.repeat(start, counts) + position
+
+    hs = history.home_score[rows]
+    aws = history.away_score[rows]
+    winner = np.where(hs > aws, history.home_code[rows], history.away_code[rows])
+    decisive = hs != aws
+    home_win = decisive & (winner == fixture_home_code[fixture_idx])
+    away_win = decisive & ~home_win
+    draw = ~decisive
+    goals = hs + aws
+    last4 = position < 4
+
+    def per_fixture(weights):
+        return np.bincount(fixture_idx, weights=weights, minlength=nb)
+
+    home_wins = per_fixture(home_win).astype(np.int64)
+    away_wins = per_fixture(away_win).astype(np.int64)
+    draws = per_fixture(draw).astype(np.int64)
+    total_goals = per_fixture(goals).astype(np.int64)
+    home_wins4 = per_fixture(home_win & last4).astype(np.int64)
+    away_wins4 = per_fixture(away_win & last4).astype(np.int64)
+    draws4 = per_fixture(draw & last4).astype(np.int64)
+    goals4 = per_fixture(goals * last4).astype(np.int64)
+    n4 = np.minimum(counts, 4)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        goals_avg = np.where(counts > 0, total_goals / counts, 0.0)
+        avg_goals4 = np.where(n4 > 0, goals4 / n4, 2.5)
+
+    double_chance = np.where(home_wins4 > away_wins4 + draws4, "1X",
+                             np.where(away_wins4 > home_wins4 + draws4, "X2", "12"))
+    over_25 = avg_goals4 > 2.5
+    confidence = np.minimum(50 + counts * 5, 95)
+    vip = ((counts >= 4) & ((home_wins >= 3) | (away_wins >= 3))) | \
+          ((counts >= 5) & ((home_wins >= counts - 1) | (away_wins >= counts - 1)))
+
+    results = []
+    for i in range(nb):
+        total = int(counts[i])
+        analysis = {
+            "total_matches": total,
+            "home_wins": int(home_wins[i]),
+            "away_wins": int(away_wins[i]),
+            "draws": int(draws[i]),
+            "goals_avg": float(goals_avg[i]) if total > 0 else 0,
+            "last_4": history.last_matches(int(start[i]), int(n4[i]))
+        }
+        prediction = {
+            "double_chance": str(double_chance[i]),
+            "over_25": bool(over_25[i]),
+            "confidence": int(confidence[i])
+        }
+        results.append((analysis, prediction, "vip" if vip[i] else "simple"))
+    return results
@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+match_store.py - Stockage local SQLite des matchs historiques (cache/matches.db)
+Remplace le fichier plat all_matches.json utilisé pour les analyses H2H.
+Rôle :
+- Créer la base et ses index (paire d'équipes, équipe, date, ligue)
+- Insérer ou mettre à jour (upsert) les événements renvoyés par l'API BSD,
+  réduits aux seuls champs utiles aux analyses H2H (project_event)
+- Répondre aux requêtes H2H sans désérialiser tout l'historique
+- Importer une seule fois l'ancien cache all_matches.json s'il existe
+- Lire et écrire par lots (mémoire bornée quelle que soit la taille de l'historique)
+- Se reconstruire depuis l'instantané en colonnes cache/matches.npz (voir columnar_cache.py)
+- Tenir l'index des jours entièrement synchronisés (cache/coverage.json)
+- Tenir un journal des ajouts (cache/journal.jsonl), fusionné dans l'instantané
+  lors du compactage
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+CACHE_DIR = "cache"
+STORE_FILE = os.path.join(CACHE_DIR, "matches.db")
+LEGACY_CACHE_FILE = os.path.join(CACHE_DIR, "all_matches.json")
+COLUMNAR_FILE = os.path.join(CACHE_DIR, "matches.npz")
+JOURNAL_FILE = os.path.join(CACHE_DIR, "journal.jsonl")
+JOURNAL_COMPACT_THRESHOLD = 20000   # lignes de journal avant compactage automatique
+COVERAGE_FILE = os.path.join(CACHE_DIR, "coverage.json")
+HISTORY_START = date(2023, 1, 1)   # début de l'historique des matchs
+BATCH_SIZE = 5000          # lignes par lot (écriture et lecture en flux)
+READ_CHUNK_SIZE = 1 << 20  # octets lus à la fois dans un fichier JSON
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id            INTEGER PRIMARY KEY,
+    event_date    TEXT NOT NULL,
+    status        TEXT,
+    home_score    INTEGER,
+    away_score    INTEGER,
+    home_team_id  INTEGER,
+    home_team     TEXT,
+    away_team_id  INTEGER,
+    away_team     TEXT,
+    league_id     INTEGER,
+    league        TEXT,
+    team_lo       INTEGER,
+    team_hi       INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_matches_pair ON matches(team_lo, team_hi, event_date);
+CREATE INDEX IF NOT EXISTS idx_matches_home_team ON matches(home_team_id);
+CREATE INDEX IF NOT EXISTS idx_matches_away_team ON matches(away_team_id);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(event_date);
+CREATE INDEX IF NOT EXISTS idx_matches_league ON matches(league);
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  TEXT
+);
+"""
+
+UPSERT_SQL = """
+INSERT INTO matches (id, event_date, status, home_score, away_score,
+                     home_team_id, home_team, away_team_id, away_team,
+                     league_id, league, team_lo, team_hi)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    event_date   = excluded.event_date,
+    status       = excluded.status,
+    home_score   = excluded.home_score,
+    away_score   = excluded.away_score,
+    home_team_id = excluded.home_team_id,
+    home_team    = excluded.home_team,
+    away_team_id = excluded.away_team_id,
+    away_team    = excluded.away_team,
+    league_id    = excluded.league_id,
+    league       = excluded.league,
+    team_lo      = excluded.team_lo,
+    team_hi      = excluded.team_hi
+WHERE (matches.event_date, matches.status, matches.home_score, matches.away_score,
+       matches.home_team_id, matches.home_team, matches.away_team_id, matches.away_team,
+       matches.league_id, matches.league)
+      IS NOT (excluded.event_date, excluded.status, excluded.home_score, excluded.away_score,
+              excluded.home_team_id, excluded.home_team, excluded.away_team_id, excluded.away_team,
+              excluded.league_id, excluded.league)
+"""
+
+# Champs conservés d'un événement /events/ : tout le reste est ignoré à l'ingestion
+PROJECTED_FIELDS = ["id", "event_date", "status", "home_score", "away_score"]
+PROJECTED_OBJECTS = {"home_team_obj": ["id", "name"], "away_team_obj": ["id", "name"],
+                     "league": ["id", "name"]}
+
+# Statuts définitifs : un match dans un autre statut (ou terminé sans score) est à resynchroniser
+FINAL_STATUSES = ("finished", "cancelled")
+
+# =======================================================
+# OUVERTURE DE LA BASE
+# =======================================================
+
+def h2h_pair_key(team_id_a, team_id_b):
+    """
+    Clé d'une confrontation, indépendante de l'ordre domicile/extérieur.
+    """
+    return (team_id_a, team_id_b) if team_id_a <= team_id_b else (team_id_b, team_id_a)
+
+def store_exists(path=STORE_FILE):
+    """
+    Indique si une base (ou un ancien cache JSON à importer) est disponible.
+    """
+    return any(os.path.exists(p) for p in (path, COLUMNAR_FILE, LEGACY_CACHE_FILE))
+
+def open_store(path=STORE_FILE):
+    """
+    Ouvre (et crée si besoin) la base SQLite des matchs.
+    À la création, la base est reconstruite depuis l'instantané matches.npz,
+    sinon depuis l'ancien cache all_matches.json s'il existe.
+    Le journal des ajouts est ensuite rejoué : la base offre la vue fusionnée
+    instantané + journal.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    is_new = not os.path.exists(path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    if not is_new:
+        migrate_drop_raw(conn, path)
+    if is_new and os.path.exists(COLUMNAR_FILE) and _columnar_cache() is not None:
+        _columnar_cache().import_columnar(conn, COLUMNAR_FILE)
+    elif is_new and os.path.exists(LEGACY_CACHE_FILE):
+        import_legacy_json(conn, LEGACY_CACHE_FILE)
+    replay_journal(conn)
+    return conn
+
+def migrate_drop_raw(conn, path=STORE_FILE):
+    """
+    Migration unique des anciennes bases : supprime la colonne `raw`
+    (événement JSON complet) puis compacte le fichier (VACUUM).
+    """
+    columns = [r["name"] for r in conn.execute("PRAGMA table_info(matches)")]
+    if "raw" not in columns:
+        return False
+    size = os.path.getsize(path)
+    print("   🔧 Migration de la base : suppression des événements bruts...")
+    conn.execute("ALTER TABLE matches DROP COLUMN raw")
+    conn.commit()
+    conn.execute("VACUUM")
+    new_size = os.path.getsize(path)
+    print(f"   ✅ Base migrée : {size // 1024} Ko → {new_size // 1024} Ko")
+    return True
+
+def _columnar_cache():
+    """
+    Module columnar_cache, ou None si NumPy n'est pas installé.
+    """
+    try:
+        import columnar_cache
+    except ImportError:
+        return None
+    return columnar_cache
+
+def export_columnar_snapshot(conn):
+    """
+    Met à jour l'instantané matches.npz après une écriture.
+    Retourne False (sans erreur) si NumPy n'est pas disponible.
+    """
+    module = _columnar_cache()
+    if module is None:
+        print("   ⚠️ NumPy absent : instantané en colonnes non mis à jour")
+        return False
+    count = module.export_columnar(conn, COLUMNAR_FILE)
+    print(f"   💾 Instantané en colonnes : {count} matchs ({COLUMNAR_FILE})")
+    return True
+
+def import_legacy_json(conn, path):
+    """
+    Importe un ancien cache all_matches.json dans la base, en flux
+    (le fichier n'est jamais chargé entièrement en mémoire).
+    """
+    print(f"   📦 Import de l'ancien cache {path}...")
+    count = upsert_matches(conn, iter_json_array(path))
+    print(f"   ✅ {count} matchs importés dans la base")
+    return count
+
+def iter_json_array(path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Parcourt un fichier contenant un tableau JSON élément par élément,
+    en lisant le fichier par blocs (analyse incrémentale).
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} : un tableau JSON est attendu")
+        pos = 1
+        eof = False
+        while True:
+            # Sauter les blancs et les virgules entre éléments
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ","):
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Élément incomplet : lire le bloc suivant
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+
+# =======================================================
+# ÉCRITURE
+# =======================================================
+
+def project_event(event):
+    """
+    Réduit un événement brut de l'API /events/ aux champs utilisés par les analyses H2H.
+    """
+    slim = {field: event.get(field) for field in PROJECTED_FIELDS}
+    for key, fields in PROJECTED_OBJECTS.items():
+        obj = event.get(key) or {}
+        slim[key] = {field: obj.get(field) for field in fields}
+    return slim
+
+def event_to_row(event):
+    """
+    Convertit un événement de l'API /events/ en ligne (projetée) de la table matches.
+    """
+    event = project_event(event)
+    home_obj = event.get("home_team_obj") or {}
+    away_obj = event.get("away_team_obj") or {}
+    league = event.get("league") or {}
+    home_id = home_obj.get("id")
+    away_id = away_obj.get("id")
+    if home_id is not None and away_id is not None:
+        team_lo, team_hi = h2h_pair_key(home_id, away_id)
+    else:
+        team_lo, team_hi = None, None
+    return (
+        event["id"],
+        event["event_date"],
+        event.get("status"),
+        event.get("home_score"),
+        event.get("away_score"),
+        home_id,
+        home_obj.get("name"),
+        away_id,
+        away_obj.get("name"),
+        league.get("id"),
+        league.get("name"),
+        team_lo,
+        team_hi,
+    )
+
+def upsert_matches(conn, events):
+    """
+    Insère les nouveaux matchs et met à jour ceux déjà présents (même id).
+    La version de la base n'augmente que si une ligne a réellement changé.
+    `events` peut être un itérable quelconque (générateur, flux JSON...).
+    Retourne le nombre d'événements traités.
+    """
+    return upsert_rows(conn, (event_to_row(e) for e in events))
+
+def upsert_rows(conn, rows):
+    """
+    Upsert de lignes déjà converties (voir event_to_row), par lots de BATCH_SIZE
+    dans une seule transaction.
+    """
+    rows = iter(rows)
+    count = 0
+    with conn:
+        before = conn.total_changes
+        while True:
+            batch = list(itertools.islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            conn.executemany(UPSERT_SQL, batch)
+            count += len(batch)
+        if conn.total_changes != before:
+            conn.execute("""
+                INSERT INTO meta (key, value) VALUES ('version', '1')
+                ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """)
+    return count
+
+# =======================================================
+# JOURNAL DES AJOUTS
+# =======================================================
+
+def append_journal(conn, events, path=JOURNAL_FILE):
+    """
+    Ajoute des événements (projetés) à la fin du journal, une ligne JSON chacun.
+    Coût proportionnel au nombre de nouveaux matchs, pas à l'historique.
+    Chaque ligne porte la version que la base aura après l'upsert qui suit
+    (store_version + 1) : le rejeu restaure ainsi la version réelle du contenu.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    version = store_version(conn) + 1
+    count = 0
+    with open(path, 'a+', encoding='utf-8') as f:
+        # Une écriture interrompue a pu laisser une ligne sans fin : on la termine
+        if f.tell() > 0:
+            f.seek(f.tell() - 1)
+            if f.read(1) != "\n":
+                f.write("\n")
+        for event in events:
+            line = {**project_event(event), "version": version}
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+def iter_journal(path=JOURNAL_FILE):
+    """
+    Parcourt les événements du journal dans l'ordre d'écriture.
+    Une ligne tronquée (écriture interrompue) est ignorée.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print("   ⚠️ Ligne du journal incomplète, ignorée")
+
+def journal_size(path=JOURNAL_FILE):
+    """
+    Nombre de lignes du journal (0 s'il n'existe pas).
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+def replay_journal(conn, path=JOURNAL_FILE):
+    """
+    Applique le journal à la base. L'upsert est idempotent : rejouer des lignes
+    déjà appliquées ne modifie rien. La version de la base devient la plus haute
+    version du journal : elle ne dépend pas du nombre de rejeux (base reconstruite
+    depuis matches.npz à chaque exécution en CI).
+    """
+    if not os.path.exists(path):
+        return 0
+    latest = 0
+
+    def events():
+        nonlocal latest
+        for event in iter_journal(path):
+            latest = max(latest, event.get("version") or 0)
+            yield event
+
+    count = upsert_matches(conn, events())
+    if latest > store_version(conn):
+        set_store_version(conn, latest)
+    return count
+
+def compact_store(conn, path=JOURNAL_FILE):
+    """
+    Compactage : fusionne le journal dans l'instantané matches.npz puis le vide.
+    Le journal est conservé si l'instantané n'a pas pu être écrit.
+    """
+    entries = journal_size(path)
+    print(f"   🗜️ Compactage : {entries} lignes de journal fusionnées")
+    if not export_columnar_snapshot(conn):
+        return False
+    if os.path.exists(path):
+        os.remove(path)
+    return True
+
+# =======================================================
+# COUVERTURE DES DATES
+# =======================================================
+
+def merge_ranges(ranges):
+    """
+    Fusionne des plages de dates [(début, fin)] qui se chevauchent ou se touchent.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+def load_coverage(conn=None, path=COVERAGE_FILE):
+    """
+    Plages de jours entièrement synchronisés, triées et fusionnées (lecture seule).
+    Sans index (première utilisation), les jours présents en base sont
+    considérés comme couverts si une connexion est fournie ; l'index n'est
+    écrit que par mark_covered (mise à jour quotidienne et historique).
+    """
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            ranges = json.load(f).get("ranges", [])
+        return [(date.fromisoformat(a), date.fromisoformat(b)) for a, b in ranges]
+    if conn is None:
+        return []
+    days = [date.fromisoformat(r[0]) for r in
+            conn.execute("SELECT DISTINCT substr(event_date, 1, 10) FROM matches")]
+    print(f"   🗂️ Index de couverture déduit de la base ({len(days)} jours)")
+    return merge_ranges((d, d) for d in days)
+
+def save_coverage(coverage, path=COVERAGE_FILE):
+    """
+    Enregistre l'index de couverture (écriture atomique).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"updated_at": datetime.now().isoformat(timespec="seconds"),
+                   "ranges": [[a.isoformat(), b.isoformat()] for a, b in coverage]}, f, indent=1)
+    os.replace(tmp, path)
+
+def mark_covered(date_from, date_to, conn=None, path=COVERAGE_FILE):
+    """
+    Note qu'une période a été entièrement téléchargée et enregistrée.
+    """
+    save_coverage(merge_ranges(load_coverage(conn, path) + [(date_from, date_to)]), path)
+
+def missing_ranges(coverage, date_from, date_to):
+    """
+    Plages de jours de [date_from, date_to] absentes de l'index de couverture.
+    """
+    gaps = []
+    cursor = date_from
+    for start, end in coverage:
+        if end < cursor:
+            continue
+        if start > date_to:
+            break
+        if start > cursor:
+            gaps.append((cursor, start - timedelta(days=1)))
+        cursor = max(cursor, end + timedelta(days=1))
+    if cursor <= date_to:
+        gaps.append((cursor, date_to))
+    return gaps
+
+# =======================================================
+# LECTURE
+# =======================================================
+
+def iter_batches(conn, sql, params=(), batch_size=BATCH_SIZE):
+    """
+    Exécute une requête et produit ses lignes par lots (fetchmany),
+    sans matérialiser tout le résultat.
+    """
+    cursor = conn.execute(sql, params)
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield batch
+
+def count_matches(conn):
+    """
+    Nombre total de matchs en base.
+    """
+    return conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+def store_version(conn):
+    """
+    Version du contenu de la base : incrémentée à chaque écriture qui modifie des matchs.
+    """
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    return int(row[0]) if row else 0
+
+def set_store_version(conn, version):
+    """
+    Fixe la version de la base (reconstruction depuis un instantané).
+    """
+    with conn:
+        conn.execute("""
+            INSERT INTO meta (key, value) VALUES ('version', ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, (str(version),))
+
+def existing_ids(conn, ids):
+    """
+    Retourne le sous-ensemble des ids déjà présents en base.
+    """
+    found = set()
+    ids = list(ids)
+    # SQLite limite le nombre de paramètres par requête
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(f"SELECT id FROM matches WHERE id IN ({placeholders})", chunk)
+        found.update(r[0] for r in rows)
+    return found
+
+def changed_events(conn, events):
+    """
+    Événements nouveaux ou dont la ligne projetée diffère de celle en base.
+    """
+    events = list(events)
+    rows = {}
+    ids = [e["id"] for e in events]
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        for r in conn.execute(f"""
+            SELECT id, event_date, status, home_score, away_score, home_team_id, home_team,
+                   away_team_id, away_team, league_id, league, team_lo, team_hi
+            FROM matches WHERE id IN ({placeholders})
+        """, chunk):
+            rows[r[0]] = tuple(r)
+    return [e for e in events if rows.get(e["id"]) != event_to_row(e)]
+
+def unresolved_dates(conn, date_from, date_to):
+    """
+    Jours (AAAA-MM-JJ) de la période contenant des matchs non résolus :
+    statut non définitif (à venir, en cours, reporté...) ou terminé sans score.
+    """
+    placeholders = ",".join("?" * len(FINAL_STATUSES))
+    rows = conn.execute(f"""
+        SELECT DISTINCT substr(event_date, 1, 10) AS day
+        FROM matches
+        WHERE event_date >= ? AND event_date < ?
+          AND (status IS NULL OR status NOT IN ({placeholders})
+               OR (status = 'finished' AND (home_score IS NULL OR away_score IS NULL)))
+        ORDER BY day
+    """, (date_from.isoformat(), (date_to + timedelta(days=1)).isoformat(), *FINAL_STATUSES))
+    return [r["day"] for r in rows]
+
+def get_h2h(conn, team_id_a, team_id_b):
+    """
+    Confrontations terminées (avec scores) entre deux équipes.
+    Retourne une liste de matchs triée par date décroissante.
+    """
+    team_lo, team_hi = h2h_pair_key(team_id_a, team_id_b)
+    rows = conn.execute("""
+        SELECT event_date, home_team, away_team, home_score, away_score, status, league
+        FROM matches
+        WHERE team_lo = ? AND team_hi = ?
+          AND status = 'finished'
+          AND home_score IS NOT NULL AND away_score IS NOT NULL
+        ORDER BY event_date DESC, id
+    """, (team_lo, team_hi))
+    return [{
+        "date": r["event_date"],
+        "home_team": r["home_team"],
+        "away_team": r["away_team"],
+        "home_score": r["home_score"],
+        "away_score": r["away_score"],
+        "status": r["status"],
+        "league": r["league"]
+    } for r in rows]
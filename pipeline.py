@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+pipeline.py - Chaîne complète en un seul processus : rattrapage, mise à jour, génération
+Le client API (session HTTP, limiteur de débit, cache des réponses) et la base des
+matchs sont ouverts une seule fois et partagés par les étapes :
+- backfill : allmatches.py, seulement si la base est vide ou avec --backfill
+- update   : update_matches.py (matchs d'hier, jours manquants, matchs non résolus)
+- generate : generate_data.py (data.json, shards)
+Utilisable comme bibliothèque : pipeline.run(...)
+Exécution : python pipeline.py [--backfill] [--no-update] [--no-generate] [--compact] [--shards]
+"""
+
+import sys
+import time
+
+import allmatches
+import bsd_client
+import generate_data
+import match_store
+import update_matches
+
+def run(backfill=None, update=True, generate=True, compact=False, shards=False,
+        client=None, conn=None):
+    """
+    Exécute les étapes demandées en partageant le client et la base.
+    backfill=None : rattrapage complet seulement si la base est vide.
+    compact / shards : options de sortie de generate_data.main().
+    """
+    own_client, own_conn = client is None, conn is None
+    client = client or bsd_client.BSDClient()
+    conn = conn or match_store.open_store()
+    timings = {}
+    try:
+        if backfill is None:
+            backfill = match_store.count_matches(conn) == 0
+        stages = [
+            ("backfill", backfill, lambda: allmatches.main(client=client, conn=conn)),
+            ("update", update, lambda: update_matches.main(client=client, conn=conn)),
+            ("generate", generate, lambda: generate_data.main(compact=compact, shards=shards,
+                                                              client=client, conn=conn)),
+        ]
+        for name, enabled, stage in stages:
+            if not enabled:
+                continue
+            start = time.perf_counter()
+            stage()
+            timings[name] = time.perf_counter() - start
+    finally:
+        if own_client:
+            client.close()
+        if own_conn:
+            conn.close()
+
+    print("\n⏱️ Durées : " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items()))
+    return timings
+
+if __name__ == "__main__":
+    run(backfill=True if "--backfill" in sys.argv else None,
+        update="--no-update" not in sys.argv,
+        generate="--no-generate" not in sys.argv,
+        compact="--compact" in sys.argv,
+        shards="--shards" in sys.argv)
@@ -7,13 +7,25 @@ Date : 2026-02-27
 
 from camoufox.sync_api import Camoufox
 from bs4 import BeautifulSoup
-import pandas as pd
 import time
-from io import StringIO
 import re
+import gzip
+import hashlib
 import json
+import os
+import queue
+import sys
+import threading
 from datetime import datetime
 
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Parseur BeautifulSoup des pages lues en entier (matchs du jour, recherche) : lxml si installé
+PARSEUR_HTML = "lxml" if lxml_html is not None else "html.parser"
+
 ###############################################################################
 # 1. CONFIGURATION GÉNÉRALE
 ###############################################################################
@@ -29,16 +41,43 @@ ANNEE_ACTUELLE = datetime.now().year
 ANNEE_PRECEDENTE = ANNEE_ACTUELLE - 1
 
 MODE_SILENCIEUX = False
-DELAI_REQUETE = 5.0
+
+# Extraction H2H en parallèle : un navigateur par page (l'API synchrone de Camoufox
+# ne se partage pas entre threads), sous une limite de politesse commune à toutes les pages
+NB_PAGES_PARALLELES = 3
+NAVIGATIONS_PAR_MINUTE = 20  # limite globale, toutes pages confondues
+OPTIONS_NAVIGATEUR = {"headless": MODE_SILENCIEUX, "humanize": True, "disable_coop": True, "window": (1280, 720)}
+TAILLE_FENETRE = {"width": 1280, "height": 720}
 
 BASE_URL = "https://fbref.com"
 URL_MATCHS_DU_JOUR = f"{BASE_URL}/en/matches/{DATE_ANALYSE}"
 URL_RECHERCHE_EQUIPE = f"{BASE_URL}/en/search/search.fcgi?search="
+FICHIER_URLS_EQUIPES = os.path.join("cache", "fbref_equipes.json")  # nom -> URL de l'effectif
+
+# Cache disque des pages HTML (compressées), durée de validité par type de page (None = illimitée)
+DOSSIER_CACHE_PAGES = os.path.join("cache", "fbref_pages")
+DUREES_CACHE = {
+    "matchs_du_jour": 10 * 60,
+    "rapport_termine": None,          # match joué : la page ne change plus
+    "rapport_a_venir": 6 * 3600,
+    "equipe": 24 * 3600,
+    "recherche": 7 * 24 * 3600,
+}
+# Mode rejeu : tout est lu dans le cache, sans navigateur (python scrapper.py --rejeu)
+MODE_REJEU = False
 
 TIMEOUT_PAGE = 60000
-ATTENTE_APRES_CHARGEMENT = 6000
+TIMEOUT_SELECTEUR = 8000           # attente de l'élément attendu avant de soupçonner Cloudflare
+ATTENTE_APRES_CHARGEMENT = 6000    # délai fixe, seulement si l'élément attendu n'apparaît pas
 TIMEOUT_TURNSTILE = 15000
 
+# Requêtes interceptées et abandonnées : seul le HTML est lu. Les feuilles de style
+# sont gardées (le clic Cloudflare par coordonnées dépend de la mise en page).
+RESSOURCES_BLOQUEES = {"image", "media", "font"}
+DOMAINES_BLOQUES = ("googletagmanager.com", "google-analytics.com", "doubleclick.net",
+                    "googlesyndication.com", "adservice.google", "amazon-adsystem.com",
+                    "scorecardresearch.com", "quantserve.com", "facebook.net", "hotjar.com")
+
 # Seuils pour les catégories de pronostics
 SEUIL_HAUT = 5
 SEUIL_MOYEN = 4
@@ -63,6 +102,7 @@ SELECTEURS_PAGE_MATCHS = {
 SELECTEURS_PAGE_MATCH = {
     "tableau_h2h": "table#games_history_all",
     "conteneur_h2h": "div.table_container[id*='head2head']",
+    "scorebox": "div.scorebox",
     "lien_rapport": "a",
     "iframe_cloudflare": "iframe[title*='Cloudflare']",
 }
@@ -73,6 +113,15 @@ SELECTEURS_PAGE_EQUIPE = {
     "logo": "img.teamlogo",
 }
 
+# Élément dont la présence signale qu'une page est chargée, par type de page
+# (le tableau H2H peut être en commentaire : on attend son conteneur ou le tableau des scores)
+SELECTEURS_ATTENTE = {
+    "matchs_du_jour": SELECTEURS_PAGE_MATCHS["conteneur_tableau"],
+    "rapport": f"{SELECTEURS_PAGE_MATCH['conteneur_h2h']}, {SELECTEURS_PAGE_MATCH['scorebox']}",
+    "equipe": f"{SELECTEURS_PAGE_EQUIPE['tableau_matchs']}, {SELECTEURS_PAGE_EQUIPE['logo']}",
+    "recherche": f"{SELECTEURS_PAGE_EQUIPE['resultats_recherche']}, {SELECTEURS_PAGE_EQUIPE['logo']}",
+}
+
 NOMS_COLONNES = {
     "DATE": "Date",
     "DOMICILE": "Home",
@@ -90,8 +139,103 @@ NOMS_COLONNES = {
 # 3. FONCTIONS UTILITAIRES
 ###############################################################################
 
+class LimiteurPolitesse:
+    """
+    Espace les navigations de toutes les pages (tous threads confondus)
+    d'au moins 60 / par_minute secondes.
+    """
+    def __init__(self, par_minute):
+        self.intervalle = 60.0 / par_minute
+        self.verrou = threading.Lock()
+        self.prochain = 0.0
+
+    def attendre(self):
+        with self.verrou:
+            maintenant = time.monotonic()
+            depart = max(maintenant, self.prochain)
+            self.prochain = depart + self.intervalle
+        if depart > maintenant:
+            time.sleep(depart - maintenant)
+
+limiteur = LimiteurPolitesse(NAVIGATIONS_PAR_MINUTE)
+
+def bloquer_ressources(route):
+    requete = route.request
+    if requete.resource_type in RESSOURCES_BLOQUEES or any(d in requete.url for d in DOMAINES_BLOQUES):
+        route.abort()
+    else:
+        route.continue_()
+
+def nouvelle_page(context):
+    """
+    Page du navigateur sans images, polices, médias ni publicités / statistiques.
+    """
+    page = context.new_page()
+    page.route("**/*", bloquer_ressources)
+    return page
+
+def naviguer(page, url):
+    """
+    page.goto() soumis à la limite de politesse globale.
+    """
+    limiteur.attendre()
+    page.goto(url, wait_until="domcontentloaded", timeout=TIMEOUT_PAGE)
+
+# Lecture rapide des tableaux : on découpe le fragment <table>...</table> dans le HTML
+# brut (FBref cache certains tableaux dans des commentaires <!-- -->, un simple find les
+# trouve quand même) et on ne parse que ce fragment, avec lxml si disponible.
+
+def extraire_tableau(html, selecteur=None, id_conteneur=None):
+    """
+    Fragment HTML du premier tableau correspondant, sans parser la page :
+    - selecteur "table#id" : le tableau portant cet id ;
+    - id_conteneur : le premier tableau après un élément dont l'id contient ce texte.
+    Retourne None si introuvable.
+    """
+    if selecteur:
+        pos = html.find(f'id="{selecteur.split("#", 1)[1]}"')
+        debut = html.rfind("<table", 0, pos) if pos >= 0 else -1
+    else:
+        trouve = re.search(r'id=["\'][^"\']*' + re.escape(id_conteneur), html)
+        debut = html.find("<table", trouve.end()) if trouve else -1
+    if debut < 0:
+        return None
+    fin = html.find("</table>", debut)
+    if fin < 0:
+        return None
+    return html[debut:fin + len("</table>")]
+
+def lignes_tableau(fragment):
+    """
+    Lignes d'un fragment <table> sous forme de dictionnaires {en-tête: texte},
+    comme pd.read_html(...).to_dict('records') (cellule vide -> "").
+    Les lignes d'en-tête répétées et les séparateurs sont ignorés.
+    """
+    if lxml_html is not None:
+        table = lxml_html.fragment_fromstring(fragment)
+        entetes = [th.text_content().strip() for th in table.xpath("./thead/tr[last()]/th")]
+        lignes = [[c.text_content().strip() for c in tr.xpath("./th|./td")]
+                  for tr in table.xpath("./tbody/tr|./tr")
+                  if "thead" not in tr.get("class", "") and "spacer" not in tr.get("class", "")]
+    else:
+        table = BeautifulSoup(fragment, "html.parser").table
+        thead = table.find("thead")
+        entetes = [th.get_text(strip=True) for th in thead.find_all("tr")[-1].find_all("th")] if thead else []
+        lignes = [[c.get_text(strip=True) for c in tr.find_all(["th", "td"], recursive=False)]
+                  for tr in (table.tbody or table).find_all("tr", recursive=False)
+                  if not {"thead", "spacer"} & set(tr.get("class", []))]
+    if not entetes and lignes:
+        entetes, lignes = lignes[0], lignes[1:]
+    enregistrements = []
+    for cellules in lignes:
+        ligne = {}
+        for entete, valeur in zip(entetes, cellules):
+            ligne.setdefault(entete, valeur)  # en-têtes en double : la première colonne compte
+        enregistrements.append(ligne)
+    return enregistrements
+
 def extraire_score(texte):
-    if not texte or pd.isna(texte):
+    if not texte:
         return None, None
     match = re.search(r'(\d+)\s*[-–]\s*(\d+)', str(texte))
     if match:
@@ -115,6 +259,74 @@ def filtrer_par_annee(liste_matchs_dict):
             gardes.append(m)
     return gardes
 
+class PageAbsenteDuCache(Exception):
+    pass
+
+def chemin_cache_page(url):
+    return os.path.join(DOSSIER_CACHE_PAGES, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html.gz")
+
+def lire_cache_page(url, type_page):
+    """
+    HTML en cache s'il est encore valide pour ce type de page (toujours en mode rejeu).
+    """
+    chemin = chemin_cache_page(url)
+    if not os.path.exists(chemin):
+        return None
+    duree = DUREES_CACHE.get(type_page)
+    if not MODE_REJEU and duree is not None and time.time() - os.path.getmtime(chemin) > duree:
+        return None
+    with gzip.open(chemin, "rt", encoding="utf-8") as f:
+        return f.read()
+
+def ecrire_cache_page(url, html):
+    os.makedirs(DOSSIER_CACHE_PAGES, exist_ok=True)
+    chemin = chemin_cache_page(url)
+    tmp = f"{chemin}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write(html)
+    os.replace(tmp, chemin)
+
+def telecharger_page(page, url, type_page):
+    """
+    Charge la page dans le navigateur avec les attentes propres à son type.
+    Retourne (html, complet) : complet est faux si l'élément attendu n'est pas apparu.
+    """
+    naviguer(page, url)
+    complet = attendre_contenu(page, SELECTEURS_ATTENTE["rapport" if type_page.startswith("rapport") else type_page])
+    return page.content(), complet
+
+def attendre_contenu(page, selecteur):
+    """
+    Attend l'élément attendu plutôt qu'un délai fixe. S'il n'apparaît pas
+    (vérification Cloudflare...), tente le contournement puis attend à nouveau ;
+    ATTENTE_APRES_CHARGEMENT ne sert qu'en dernier recours.
+    """
+    for essai in range(2):
+        try:
+            page.wait_for_selector(selecteur, state="attached", timeout=TIMEOUT_SELECTEUR)
+            return True
+        except Exception:
+            if essai == 0:
+                contourner_cloudflare(page)
+    page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT)
+    return False
+
+def obtenir_html(page, url, type_page):
+    """
+    HTML d'une page : depuis le cache disque s'il est valide, sinon via le navigateur
+    (mise en cache seulement si l'élément attendu est apparu, hors page Cloudflare).
+    En mode rejeu, une page absente du cache lève PageAbsenteDuCache.
+    """
+    html = lire_cache_page(url, type_page)
+    if html is not None:
+        return html
+    if MODE_REJEU or page is None:
+        raise PageAbsenteDuCache(f"page absente du cache : {url}")
+    html, complet = telecharger_page(page, url, type_page)
+    if complet and "challenge-platform" not in html:
+        ecrire_cache_page(url, html)
+    return html
+
 def contourner_cloudflare(page):
     try:
         iframe = page.frame_locator(SELECTEURS_PAGE_MATCH["iframe_cloudflare"])
@@ -122,13 +334,11 @@ def contourner_cloudflare(page):
         cb.wait_for(timeout=TIMEOUT_TURNSTILE)
         cb.click(force=True)
         print("    ✓ Cloudflare contourné (iframe)")
-        page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT)
         return True
     except:
         try:
             page.mouse.click(210, 335)
             print("    ✓ Cloudflare contourné (coordonnées)")
-            page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT)
             return True
         except:
             print("    ℹ Aucun Cloudflare détecté")
@@ -140,87 +350,102 @@ def nettoyer_nom_equipe(nom):
     nom = re.sub(r'\s*\([^)]*\)', '', nom).strip()
     return nom
 
+def charger_urls_equipes():
+    """
+    Correspondances nom d'équipe -> URL FBref de l'effectif, conservées entre les exécutions.
+    """
+    if not os.path.exists(FICHIER_URLS_EQUIPES):
+        return {}
+    try:
+        with open(FICHIER_URLS_EQUIPES, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def sauver_urls_equipes():
+    os.makedirs(os.path.dirname(FICHIER_URLS_EQUIPES), exist_ok=True)
+    tmp = FICHIER_URLS_EQUIPES + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(urls_equipes, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, FICHIER_URLS_EQUIPES)
+
+urls_equipes = charger_urls_equipes()   # nom -> URL (persistant)
+infos_equipes = {}                      # URL -> {"logo", "forme"} (pour l'exécution en cours)
+
 def trouver_url_equipe(page, nom_equipe):
+    if nom_equipe in urls_equipes:
+        return urls_equipes[nom_equipe]
     nom_nettoye = nettoyer_nom_equipe(nom_equipe)
     try:
         search = nom_nettoye.replace(" ", "+")
-        page.goto(f"{URL_RECHERCHE_EQUIPE}{search}", wait_until="domcontentloaded", timeout=TIMEOUT_PAGE)
-        page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT//2)
-        html = page.content().replace("<!--","").replace("-->","")
-        soup = BeautifulSoup(html, "html.parser")
+        html = obtenir_html(page, f"{URL_RECHERCHE_EQUIPE}{search}", "recherche").replace("<!--","").replace("-->","")
+        soup = BeautifulSoup(html, PARSEUR_HTML)
         for result in soup.select(SELECTEURS_PAGE_EQUIPE["resultats_recherche"]):
             if "teams" in str(result) and nom_nettoye.lower() in str(result).lower():
                 liens = result.find_all("a", href=True)
                 for lien in liens:
                     if "/en/squads/" in lien["href"]:
-                        return BASE_URL + lien["href"]
+                        urls_equipes[nom_equipe] = BASE_URL + lien["href"]
+                        sauver_urls_equipes()
+                        return urls_equipes[nom_equipe]
         return None
     except:
         return None
 
-def recuperer_logo_equipe(page, nom_equipe):
-    url_equipe = trouver_url_equipe(page, nom_equipe)
-    if not url_equipe:
-        return None
-    try:
-        page.goto(url_equipe, wait_until="domcontentloaded", timeout=TIMEOUT_PAGE)
-        page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT//2)
-        html = page.content().replace("<!--","").replace("-->","")
-        soup = BeautifulSoup(html, "html.parser")
-        img = soup.select_one(SELECTEURS_PAGE_EQUIPE["logo"])
-        if img and img.get("src"):
-            return BASE_URL + img["src"] if img["src"].startswith("/") else img["src"]
-        return None
-    except:
+def extraire_logo(html):
+    # Seule la balise <img class="teamlogo"> est lue, pas la page entière
+    pos = html.find('class="teamlogo"')
+    if pos < 0:
         return None
+    balise = html[html.rfind("<img", 0, pos):html.find(">", pos) + 1]
+    src = re.search(r'src="([^"]+)"', balise)
+    if src:
+        return BASE_URL + src.group(1) if src.group(1).startswith("/") else src.group(1)
+    return None
 
-def recuperer_forme_equipe(page, nom_equipe):
+def extraire_forme(html, nom_equipe):
     """
-    Récupère la forme récente (5 derniers matchs) d'une équipe.
+    Forme récente (5 derniers matchs) lue dans le tableau matchlogs_for.
     Retourne une chaîne comme "V V N D V".
     """
-    url_equipe = trouver_url_equipe(page, nom_equipe)
-    if not url_equipe:
-        return None
     try:
-        page.goto(url_equipe, wait_until="domcontentloaded", timeout=TIMEOUT_PAGE)
-        page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT//2)
-        html = page.content().replace("<!--","").replace("-->","")
-        soup = BeautifulSoup(html, "html.parser")
-        tableau = soup.select_one(SELECTEURS_PAGE_EQUIPE["tableau_matchs"])
+        tableau = extraire_tableau(html, SELECTEURS_PAGE_EQUIPE["tableau_matchs"])
         if not tableau:
             print(f"      ⚠️ Tableau matchlogs_for non trouvé pour {nom_equipe}")
             return None
-        df = pd.read_html(StringIO(str(tableau)))[0]
+        lignes = lignes_tableau(tableau)
+        if not lignes:
+            return None
+        colonnes = list(lignes[0])
         # Identifier la colonne "Result" (peut être différente selon le tableau)
         # On va chercher une colonne contenant "Result" dans son nom
         col_result = None
-        for col in df.columns:
-            if "Result" in str(col):
+        for col in colonnes:
+            if NOMS_COLONNES["RESULTAT"] in col:
                 col_result = col
                 break
         if col_result is None:
             # Fallback : on suppose que c'est la 6ème colonne
-            col_result = df.columns[5] if len(df.columns) > 5 else None
+            col_result = colonnes[5] if len(colonnes) > 5 else None
         if col_result is None:
             return None
 
         # Filtrer par année en utilisant la première colonne (date)
         matchs_filtres = []
-        for idx, row in df.iterrows():
-            date_str = str(row.iloc[0])
+        for ligne in lignes:
+            date_str = ligne.get(colonnes[0], "")
             annee = None
             ma = re.search(r'(\d{4})', date_str)
             if ma:
                 annee = int(ma.group(1))
             if annee and (annee == ANNEE_ACTUELLE or annee == ANNEE_PRECEDENTE):
-                matchs_filtres.append(row)
+                matchs_filtres.append(ligne)
 
         # Prendre les 5 derniers (les plus récents sont en haut du tableau normalement)
         matchs_recents = matchs_filtres[:5]
         forme = []
         for match in matchs_recents:
-            res = str(match.get(col_result, "")).strip()
+            res = match.get(col_result, "").strip()
             if res == "W":
                 forme.append("V")
             elif res == "D":
@@ -234,6 +459,33 @@ def recuperer_forme_equipe(page, nom_equipe):
         print(f"      ⚠️ Erreur forme équipe: {str(e)}")
         return None
 
+def infos_equipe(page, nom_equipe):
+    """
+    Logo et forme d'une équipe : la page de l'effectif n'est chargée qu'une fois
+    par exécution et analysée une seule fois pour les deux informations.
+    """
+    url_equipe = trouver_url_equipe(page, nom_equipe)
+    if not url_equipe:
+        return {"logo": None, "forme": None}
+    if url_equipe not in infos_equipes:
+        try:
+            html = obtenir_html(page, url_equipe, "equipe")
+            infos_equipes[url_equipe] = {"logo": extraire_logo(html), "forme": extraire_forme(html, nom_equipe)}
+        except Exception as e:
+            print(f"      ⚠️ Erreur page équipe: {str(e)}")
+            return {"logo": None, "forme": None}
+    return infos_equipes[url_equipe]
+
+def recuperer_logo_equipe(page, nom_equipe):
+    return infos_equipe(page, nom_equipe)["logo"]
+
+def recuperer_forme_equipe(page, nom_equipe):
+    """
+    Récupère la forme récente (5 derniers matchs) d'une équipe.
+    Retourne une chaîne comme "V V N D V".
+    """
+    return infos_equipe(page, nom_equipe)["forme"]
+
 ###############################################################################
 # 4. EXTRACTION DES MATCHS DU JOUR
 ###############################################################################
@@ -242,14 +494,10 @@ def recuperer_matchs_du_jour(page):
     print(f"\n📅 RÉCUPÉRATION DES MATCHS DU {DATE_ANALYSE}")
     print(f"   URL: {URL_MATCHS_DU_JOUR}")
     try:
-        page.goto(URL_MATCHS_DU_JOUR, wait_until="domcontentloaded", timeout=TIMEOUT_PAGE)
-        page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT)
-        contourner_cloudflare(page)
-        page.wait_for_selector(SELECTEURS_PAGE_MATCHS["conteneur_tableau"], timeout=TIMEOUT_PAGE)
+        html = obtenir_html(page, URL_MATCHS_DU_JOUR, "matchs_du_jour").replace("<!--", "").replace("-->", "")
         print("   ✓ Page chargée")
 
-        html = page.content().replace("<!--", "").replace("-->", "")
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, PARSEUR_HTML)
         conteneurs = soup.select(SELECTEURS_PAGE_MATCHS["conteneur_tableau"])
         print(f"   ✓ {len(conteneurs)} compétitions trouvées")
 
@@ -322,11 +570,13 @@ def recuperer_matchs_du_jour(page):
 # 5. ANALYSE H2H D'UN MATCH (CORRIGÉE)
 ###############################################################################
 
-def analyser_h2h(df_h2h, nom_domicile_actuel, nom_exterieur_actuel):
-    if df_h2h is None or df_h2h.empty:
+def analyser_h2h(matchs_bruts, nom_domicile_actuel, nom_exterieur_actuel):
+    """
+    matchs_bruts : lignes du tableau H2H (dictionnaires indexés par NOMS_COLONNES).
+    """
+    if not matchs_bruts:
         return None
 
-    matchs_bruts = df_h2h.to_dict('records')
     matchs_filtres = filtrer_par_annee(matchs_bruts)
     if not matchs_filtres:
         return None
@@ -433,29 +683,22 @@ def analyser_h2h(df_h2h, nom_domicile_actuel, nom_exterieur_actuel):
 
     return stats
 
-def obtenir_donnees_h2h_match(page, url_match, nom_domicile, nom_exterieur):
+def obtenir_donnees_h2h_match(page, url_match, nom_domicile, nom_exterieur, termine=False):
     print(f"    🎯 Extraction H2H...")
     try:
-        page.goto(url_match, wait_until="domcontentloaded", timeout=TIMEOUT_PAGE)
-        page.wait_for_timeout(ATTENTE_APRES_CHARGEMENT)
-        contourner_cloudflare(page)
+        type_page = "rapport_termine" if termine else "rapport_a_venir"
+        html = obtenir_html(page, url_match, type_page)
 
-        html = page.content().replace("<!--", "").replace("-->", "")
-        soup = BeautifulSoup(html, "html.parser")
-
-        tableau_h2h = soup.select_one(SELECTEURS_PAGE_MATCH["tableau_h2h"])
-        if not tableau_h2h:
-            conteneur = soup.select_one(SELECTEURS_PAGE_MATCH["conteneur_h2h"])
-            if conteneur:
-                tableau_h2h = conteneur.find("table")
+        tableau_h2h = extraire_tableau(html, SELECTEURS_PAGE_MATCH["tableau_h2h"]) \
+            or extraire_tableau(html, id_conteneur="head2head")
         if not tableau_h2h:
             print("    ⚠️  Tableau H2H introuvable")
             return None
 
-        df = pd.read_html(StringIO(str(tableau_h2h)))[0]
-        print(f"    ✓ {len(df)} matchs H2H trouvés")
+        matchs_h2h = lignes_tableau(tableau_h2h)
+        print(f"    ✓ {len(matchs_h2h)} matchs H2H trouvés")
 
-        stats_h2h = analyser_h2h(df, nom_domicile, nom_exterieur)
+        stats_h2h = analyser_h2h(matchs_h2h, nom_domicile, nom_exterieur)
         if not stats_h2h:
             print("    ⚠️  Aucun match H2H des années 2025-2026 avec score trouvé")
             return None
@@ -466,6 +709,50 @@ def obtenir_donnees_h2h_match(page, url_match, nom_domicile, nom_exterieur):
         print(f"    ✗ Erreur H2H: {str(e)}")
         return None
 
+def h2h_du_match(page, m):
+    # Un match joué (score "2–1" dans la cellule du rapport) ne change plus :
+    # sa page peut rester indéfiniment en cache
+    termine = extraire_score(m['score'])[0] is not None
+    return obtenir_donnees_h2h_match(page, m['url_match'], m['equipe_domicile'], m['equipe_exterieur'], termine)
+
+def extraire_h2h_en_parallele(matchs, nb_pages=NB_PAGES_PARALLELES):
+    """
+    Exécute obtenir_donnees_h2h_match sur plusieurs pages en même temps.
+    Chaque thread ouvre son propre navigateur et prend le match suivant dans la file.
+    Retourne les statistiques dans l'ordre de `matchs` (None si pas de H2H).
+    En mode rejeu, les pages viennent du cache : pas de navigateur, exécution séquentielle.
+    """
+    if MODE_REJEU:
+        return [h2h_du_match(None, m) for m in matchs]
+    taches = queue.Queue()
+    for i, m in enumerate(matchs):
+        taches.put((i, m))
+    resultats = [None] * len(matchs)
+
+    def travailleur():
+        try:
+            with Camoufox(**OPTIONS_NAVIGATEUR) as browser:
+                context = browser.new_context(viewport=TAILLE_FENETRE)
+                page = nouvelle_page(context)
+                try:
+                    while True:
+                        try:
+                            i, m = taches.get_nowait()
+                        except queue.Empty:
+                            return
+                        resultats[i] = h2h_du_match(page, m)
+                finally:
+                    context.close()
+        except Exception as e:
+            print(f"    ✗ Erreur navigateur parallèle: {str(e)}")
+
+    threads = [threading.Thread(target=travailleur, daemon=True) for _ in range(min(nb_pages, len(matchs)))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resultats
+
 ###############################################################################
 # 6. PRONOSTICS
 ###############################################################################
@@ -654,127 +941,131 @@ def exporter_json(resultats, nom_fichier="pronostics.json"):
 # 8. FONCTION PRINCIPALE
 ###############################################################################
 
-def main():
+def analyser_journee(page):
+    """
+    Étapes 1 à 6 : matchs du jour, H2H, filtres et pronostics, logos et formes,
+    affichage et export. page=None en mode rejeu (tout vient du cache des pages).
+    """
+    # ÉTAPE 1: Récupération des matchs du jour
+    print("\n📥 ÉTAPE 1: Récupération des matchs du jour...")
+    tous_matchs = recuperer_matchs_du_jour(page)
+    if not tous_matchs:
+        print("❌ Aucun match trouvé.")
+        return
+
+    # ÉTAPE 2: Pour chaque match, récupérer les H2H (plusieurs pages en parallèle)
+    print(f"\n🔍 ÉTAPE 2: Récupération des H2H ({NB_PAGES_PARALLELES} pages en parallèle)...")
+    a_analyser = [m for m in tous_matchs if m['url_match']]
+    stats_matchs = extraire_h2h_en_parallele(a_analyser)
+    matchs_avec_h2h = []
+    for i, (m, stats) in enumerate(zip(a_analyser, stats_matchs), 1):
+        print(f"   {i:3}. {m['equipe_domicile'][:20]} vs {m['equipe_exterieur'][:20]} ", end="")
+        if stats:
+            m['stats_h2h'] = stats
+            m['nb_h2h'] = stats['total_matchs']
+            matchs_avec_h2h.append(m)
+            print(f"✓ {stats['total_matchs']} H2H")
+        else:
+            print("✗ Pas de H2H récent")
+
+    # ÉTAPE 3: Classer et filtrer selon les critères
+    print("\n📊 ÉTAPE 3: Application des filtres et pronostics...")
+    resultats = {"5+": [], "4": [], "3": []}
+
+    for match in matchs_avec_h2h:
+        nb = match['nb_h2h']
+        stats = match['stats_h2h']
+        if nb >= SEUIL_HAUT:
+            pronos = pronostiquer(stats, "5+")
+            if pronos:
+                match['pronostics'] = pronos
+                resultats["5+"].append(match)
+        elif nb == SEUIL_MOYEN:
+            pronos = pronostiquer(stats, "4")
+            if pronos:
+                match['pronostics'] = pronos
+                resultats["4"].append(match)
+        elif nb == SEUIL_BAS:
+            pronos = pronostiquer(stats, "3")
+            if pronos:
+                match['pronostics'] = pronos
+                resultats["3"].append(match)
+
+    # ÉTAPE 4: Récupération des logos et formes pour les matchs sélectionnés
+    print("\n🖼️ ÉTAPE 4: Récupération des logos et formes récentes...")
+    for cat, liste in resultats.items():
+        for match in liste:
+            print(f"   • {match['equipe_domicile']} vs {match['equipe_exterieur']}")
+            infos_dom = infos_equipe(page, match['equipe_domicile'])
+            infos_ext = infos_equipe(page, match['equipe_exterieur'])
+            match['logo_domicile'] = infos_dom["logo"]
+            match['logo_exterieur'] = infos_ext["logo"]
+            match['forme_domicile'] = infos_dom["forme"]
+            match['forme_exterieur'] = infos_ext["forme"]
+
+    # ÉTAPE 5: Affichage des résultats par catégorie
+    print("\n📈 ÉTAPE 5: Résultats")
+    for cat, liste in resultats.items():
+        if liste:
+            print(f"\n{'='*80}")
+            print(f"CATÉGORIE {cat} H2H ({len(liste)} matchs)")
+            print(f"{'='*80}")
+            for idx, match in enumerate(liste, 1):
+                afficher_en_tete_match(
+                    match,
+                    logo_dom=match.get('logo_domicile'),
+                    logo_ext=match.get('logo_exterieur'),
+                    forme_dom=match.get('forme_domicile'),
+                    forme_ext=match.get('forme_exterieur')
+                )
+                afficher_stats_h2h(match['stats_h2h'])
+                afficher_pronostics(match['pronostics'], cat)
+                if idx < len(liste):
+                    print(f"\n⏳ ---")
+        else:
+            print(f"\n📭 Aucun match dans la catégorie {cat} H2H répondant aux critères.")
+
+    # ÉTAPE 6: Export JSON
+    exporter_json(resultats)
+
+    # Résumé final
+    total_filtres = sum(len(lst) for lst in resultats.values())
+    print(f"\n{'='*80}")
+    print("✅ ANALYSE TERMINÉE")
+    print(f"{'='*80}")
+    print(f"   • Matchs du jour         : {len(tous_matchs)}")
+    print(f"   • Matchs avec H2H récents : {len(matchs_avec_h2h)}")
+    print(f"   • Matchs avec pronostics  : {total_filtres}")
+    print(f"   • Répartition : 5+ H2H: {len(resultats['5+'])}  |  4 H2H: {len(resultats['4'])}  |  3 H2H: {len(resultats['3'])}")
+
+def main(rejeu=False):
+    global MODE_REJEU
+    MODE_REJEU = rejeu
     print("\n" + "="*80)
     print("FBREF PRONOSTICS – ANALYSE H2H AVEC FIABILITÉ")
     print(f"Date: {DATE_ANALYSE} | Période H2H: {ANNEE_PRECEDENTE}-{ANNEE_ACTUELLE}")
+    if rejeu:
+        print(f"Mode rejeu : pages lues dans {DOSSIER_CACHE_PAGES}, sans navigateur")
     print("="*80)
 
-    with Camoufox(headless=MODE_SILENCIEUX, humanize=True, disable_coop=True, window=(1280,720)) as browser:
-        context = browser.new_context(viewport={"width":1280,"height":720})
-        page = context.new_page()
-
-        try:
-            # ÉTAPE 1: Récupération des matchs du jour
-            print("\n📥 ÉTAPE 1: Récupération des matchs du jour...")
-            tous_matchs = recuperer_matchs_du_jour(page)
-            if not tous_matchs:
-                print("❌ Aucun match trouvé.")
-                return
-
-            # ÉTAPE 2: Pour chaque match, récupérer les H2H
-            print("\n🔍 ÉTAPE 2: Récupération des H2H...")
-            matchs_avec_h2h = []
-            for i, m in enumerate(tous_matchs, 1):
-                if m['url_match']:
-                    print(f"   {i:3}. {m['equipe_domicile'][:20]} vs {m['equipe_exterieur'][:20]} ", end="")
-                    stats = obtenir_donnees_h2h_match(page, m['url_match'], m['equipe_domicile'], m['equipe_exterieur'])
-                    if stats:
-                        m['stats_h2h'] = stats
-                        m['nb_h2h'] = stats['total_matchs']
-                        matchs_avec_h2h.append(m)
-                        print(f"✓ {stats['total_matchs']} H2H")
-                    else:
-                        print("✗ Pas de H2H récent")
-                    time.sleep(DELAI_REQUETE)
-
-            # ÉTAPE 3: Classer et filtrer selon les critères
-            print("\n📊 ÉTAPE 3: Application des filtres et pronostics...")
-            resultats = {"5+": [], "4": [], "3": []}
-
-            for match in matchs_avec_h2h:
-                nb = match['nb_h2h']
-                stats = match['stats_h2h']
-                if nb >= SEUIL_HAUT:
-                    pronos = pronostiquer(stats, "5+")
-                    if pronos:
-                        match['pronostics'] = pronos
-                        resultats["5+"].append(match)
-                elif nb == SEUIL_MOYEN:
-                    pronos = pronostiquer(stats, "4")
-                    if pronos:
-                        match['pronostics'] = pronos
-                        resultats["4"].append(match)
-                elif nb == SEUIL_BAS:
-                    pronos = pronostiquer(stats, "3")
-                    if pronos:
-                        match['pronostics'] = pronos
-                        resultats["3"].append(match)
-
-            # ÉTAPE 4: Récupération des logos et formes pour les matchs sélectionnés
-            print("\n🖼️ ÉTAPE 4: Récupération des logos et formes récentes...")
-            for cat, liste in resultats.items():
-                for match in liste:
-                    print(f"   • {match['equipe_domicile']} vs {match['equipe_exterieur']}")
-                    match['logo_domicile'] = recuperer_logo_equipe(page, match['equipe_domicile'])
-                    time.sleep(DELAI_REQUETE/2)
-                    match['logo_exterieur'] = recuperer_logo_equipe(page, match['equipe_exterieur'])
-                    time.sleep(DELAI_REQUETE/2)
-                    match['forme_domicile'] = recuperer_forme_equipe(page, match['equipe_domicile'])
-                    time.sleep(DELAI_REQUETE/2)
-                    match['forme_exterieur'] = recuperer_forme_equipe(page, match['equipe_exterieur'])
-                    time.sleep(DELAI_REQUETE/2)
-
-            # ÉTAPE 5: Affichage des résultats par catégorie
-            print("\n📈 ÉTAPE 5: Résultats")
-            for cat, liste in resultats.items():
-                if liste:
-                    print(f"\n{'='*80}")
-                    print(f"CATÉGORIE {cat} H2H ({len(liste)} matchs)")
-                    print(f"{'='*80}")
-                    for idx, match in enumerate(liste, 1):
-                        afficher_en_tete_match(
-                            match,
-                            logo_dom=match.get('logo_domicile'),
-                            logo_ext=match.get('logo_exterieur'),
-                            forme_dom=match.get('forme_domicile'),
-                            forme_ext=match.get('forme_exterieur')
-                        )
-                        afficher_stats_h2h(match['stats_h2h'])
-                        afficher_pronostics(match['pronostics'], cat)
-                        if idx < len(liste):
-                            print(f"\n⏳ ---")
-                else:
-                    print(f"\n📭 Aucun match dans la catégorie {cat} H2H répondant aux critères.")
-
-            # ÉTAPE 6: Export JSON
-            exporter_json(resultats)
-
-            # Résumé final
-            total_filtres = sum(len(lst) for lst in resultats.values())
-            print(f"\n{'='*80}")
-            print("✅ ANALYSE TERMINÉE")
-            print(f"{'='*80}")
-            print(f"   • Matchs du jour         : {len(tous_matchs)}")
-            print(f"   • Matchs avec H2H récents : {len(matchs_avec_h2h)}")
-            print(f"   • Matchs avec pronostics  : {total_filtres}")
-            print(f"   • Répartition : 5+ H2H: {len(resultats['5+'])}  |  4 H2H: {len(resultats['4'])}  |  3 H2H: {len(resultats['3'])}")
-
-        except KeyboardInterrupt:
-            print("\n⏹️ Interruption utilisateur")
-        except Exception as e:
-            print(f"\n❌ Erreur critique: {str(e)}")
-        finally:
-            context.close()
-            browser.close()
-            print("\n🧹 Navigateur fermé")
-
-###############################################################################
-# 9. EXÉCUTION
-###############################################################################
+    try:
+        if rejeu:
+            analyser_journee(None)
+            return
+        with Camoufox(**OPTIONS_NAVIGATEUR) as browser:
+            context = browser.new_context(viewport=TAILLE_FENETRE)
+            try:
+                analyser_journee(nouvelle_page(context))
+            finally:
+                context.close()
+                browser.close()
+    except KeyboardInterrupt:
+        print("\n⏹️ Interruption utilisateur")
+    except Exception as e:
+        print(f"\n❌ Erreur critique: {str(e)}")
 
 if __name__ == "__main__":
     debut = time.time()
-    main()
+    main(rejeu="--rejeu" in sys.argv)
     duree = time.time() - debut
     print(f"\n⏱️  Durée totale : {int(duree//60)}min {int(duree%60)}sec")
\ No newline at end of file
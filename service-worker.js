@@ -1,10 +1,13 @@
 /**
  * service-worker.js - Met en cache les ressources pour un fonctionnement hors ligne
- * Stratégie : cache-first pour les fichiers statiques, réseau pour le reste.
+ * Stratégie : cache-first pour les fichiers statiques, network-first pour les données
+ * (data.json et shards data/), réseau pour le reste.
+ * Une nouvelle version s'active tout de suite (skipWaiting + clients.claim) : les pages
+ * ouvertes ne gardent pas un ancien main.js face à un nouveau format de data.json.
  * Chemins relatifs pour GitHub Pages.
  */
 
-const CACHE_NAME = 'mr-xpronos-v1';
+const CACHE_NAME = 'mr-xpronos-v3';
 const urlsToCache = [
     'index.html',
     'pronos.html',
@@ -22,16 +25,44 @@ const urlsToCache = [
     'data.json'
 ];
 
-// Installation : mise en cache des fichiers essentiels
+// Installation : mise en cache des fichiers essentiels, puis activation immédiate
 self.addEventListener('install', event => {
     event.waitUntil(
         caches.open(CACHE_NAME)
             .then(cache => cache.addAll(urlsToCache))
+            .then(() => self.skipWaiting())
     );
 });
 
-// Interception des requêtes : réponse depuis le cache si disponible, sinon réseau
+// Données publiées chaque jour : data.json et shards data/*.json
+function isDataRequest(request) {
+    const path = new URL(request.url).pathname;
+    return path.endsWith('/data.json') || path.includes('/data/');
+}
+
+// Network-first : dernière version en ligne, copie en cache pour le mode hors ligne
+// (enregistrée sans le paramètre anti-cache ?t=, une seule entrée par fichier)
+function networkFirst(request) {
+    const url = new URL(request.url);
+    url.search = '';
+    return fetch(request)
+        .then(response => {
+            if (response.ok) {
+                const copy = response.clone();
+                caches.open(CACHE_NAME).then(cache => cache.put(url.href, copy));
+            }
+            return response;
+        })
+        .catch(() => caches.match(url.href));
+}
+
+// Interception des requêtes : données en network-first ; sinon réponse depuis
+// le cache si disponible, puis réseau
 self.addEventListener('fetch', event => {
+    if (event.request.method === 'GET' && isDataRequest(event.request)) {
+        event.respondWith(networkFirst(event.request));
+        return;
+    }
     event.respondWith(
         caches.match(event.request)
             .then(response => response || fetch(event.request))
@@ -46,6 +77,6 @@ self.addEventListener('activate', event => {
                 cacheNames.filter(name => name !== CACHE_NAME)
                     .map(name => caches.delete(name))
             );
-        })
+        }).then(() => self.clients.claim())
     );
 });
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+snapshot.py - Export / import d'un instantané compressé et versionné de la base des matchs
+Format : une ligne JSON d'en-tête (version de schéma, colonnes, nombre de matchs,
+version de la base, couverture des dates), une ligne JSON par match, puis une ligne
+de fin contenant la somme SHA-256 des lignes de matchs.
+Compression zstd si le module zstandard est installé, sinon gzip.
+L'import décompresse et charge en flux, dans une seule transaction : un instantané
+tronqué ou corrompu n'est jamais appliqué.
+Exécution :
+    python snapshot.py export [fichier]
+    python snapshot.py import fichier
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+from datetime import datetime
+
+import match_store
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# =======================================================
+# CONFIGURATION
+# =======================================================
+SNAPSHOT_FORMAT = "xpronos-matches"
+SNAPSHOT_SCHEMA = 1
+SNAPSHOT_COLUMNS = ["id", "event_date", "status", "home_score", "away_score",
+                    "home_team_id", "home_team", "away_team_id", "away_team",
+                    "league_id", "league", "team_lo", "team_hi"]
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+def default_snapshot_path():
+    """
+    Chemin par défaut selon la compression disponible.
+    """
+    ext = "zst" if zstandard is not None else "gz"
+    return os.path.join(match_store.CACHE_DIR, f"matches-snapshot.jsonl.{ext}")
+
+# =======================================================
+# COMPRESSION
+# =======================================================
+
+def _open_write(path):
+    """
+    Flux texte compressé en écriture (zstd pour .zst, gzip sinon).
+    """
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Module zstandard absent : utilisez un fichier .gz")
+        raw = open(path, 'wb')
+        stream = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+
+def _open_read(path):
+    """
+    Flux texte décompressé en lecture ; la compression est reconnue à l'en-tête du fichier.
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("Instantané zstd : le module zstandard est nécessaire")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    raise ValueError(f"{path} : format d'instantané inconnu")
+
+# =======================================================
+# EXPORT / IMPORT
+# =======================================================
+
+def export_snapshot(conn, path=None):
+    """
+    Écrit l'instantané compressé de toute la base (écriture atomique).
+    Retourne l'en-tête écrit.
+    """
+    path = path or default_snapshot_path()
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "schema": SNAPSHOT_SCHEMA,
+        "columns": SNAPSHOT_COLUMNS,
+        "count": match_store.count_matches(conn),
+        "store_version": match_store.store_version(conn),
+        "coverage": [[a.isoformat(), b.isoformat()] for a, b in match_store.load_coverage(conn)],
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Le suffixe de compression est conservé pour que _open_write le reconnaisse
+    tmp = f"{path}.tmp{os.path.splitext(path)[1]}"
+    digest = hashlib.sha256()
+    with _open_write(tmp) as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        sql = f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM matches ORDER BY id"
+        for batch in match_store.iter_batches(conn, sql):
+            for row in batch:
+                line = json.dumps(list(row), ensure_ascii=False) + "\n"
+                digest.update(line.encode('utf-8'))
+                f.write(line)
+        f.write(json.dumps({"sha256": digest.hexdigest()}) + "\n")
+    os.replace(tmp, path)
+    return header
+
+def _iter_rows(f, header, path):
+    """
+    Lignes de matchs de l'instantané ; vérifie la somme de contrôle à la fin
+    (exception avant la fin de la transaction si elle ne correspond pas).
+    """
+    digest = hashlib.sha256()
+    count = 0
+    for line in f:
+        value = json.loads(line)
+        if isinstance(value, dict):
+            if value.get("sha256") != digest.hexdigest() or count != header["count"]:
+                raise ValueError(f"{path} : somme de contrôle invalide, import annulé")
+            return
+        digest.update(line.encode('utf-8'))
+        count += 1
+        yield tuple(value)
+    raise ValueError(f"{path} : instantané tronqué, import annulé")
+
+def import_snapshot(conn, path):
+    """
+    Charge un instantané en flux dans la base (upsert, une seule transaction),
+    puis restaure la version de la base et l'index de couverture.
+    Retourne le nombre de matchs importés.
+    """
+    with _open_read(path) as f:
+        header = json.loads(f.readline())
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} : ce n'est pas un instantané de matchs")
+        if header.get("schema") != SNAPSHOT_SCHEMA or header.get("columns") != SNAPSHOT_COLUMNS:
+            raise ValueError(f"{path} : schéma {header.get('schema')} non pris en charge")
+        print(f"   📦 Import de l'instantané {path} ({header['count']} matchs, {header['created_at']})...")
+        count = match_store.upsert_rows(conn, _iter_rows(f, header, path))
+
+    match_store.set_store_version(conn, max(header["store_version"], match_store.store_version(conn)))
+    coverage = [(datetime.fromisoformat(a).date(), datetime.fromisoformat(b).date())
+                for a, b in header["coverage"]]
+    match_store.save_coverage(match_store.merge_ranges(match_store.load_coverage() + coverage))
+    print(f"   ✅ {count} matchs importés ({match_store.count_matches(conn)} en base)")
+    return count
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command not in ("export", "import") or (command == "import" and len(sys.argv) < 3):
+        print(__doc__)
+        sys.exit(1)
+    conn = match_store.open_store()
+    if command == "export":
+        path = sys.argv[2] if len(sys.argv) > 2 else default_snapshot_path()
+        header = export_snapshot(conn, path)
+        print(f"💾 {header['count']} matchs exportés dans {path} ({os.path.getsize(path) // 1024} Ko)")
+    else:
+        import_snapshot(conn, sys.argv[2])
+        match_store.compact_store(conn)
+    conn.close()
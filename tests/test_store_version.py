@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Non-régression : la version de la base (h2h_version des empreintes de generate_data)
+ne dépend que du contenu persisté (matches.npz + journal), pas du nombre de
+reconstructions de matches.db (non conservée en CI).
+"""
+
+import os
+
+import pytest
+
+import match_store
+
+pytest.importorskip("numpy")
+
+def event(i, status="finished"):
+    return {"id": i, "event_date": f"2024-01-{i:02d}T12:00:00Z", "status": status,
+            "home_score": 1, "away_score": 0,
+            "home_team_obj": {"id": 1, "name": "A"}, "away_team_obj": {"id": 2, "name": "B"},
+            "league": {"id": 1, "name": "L"}}
+
+def write(conn, events):
+    # Même séquence que update_matches.py : journal puis upsert
+    match_store.append_journal(conn, match_store.changed_events(conn, events))
+    match_store.upsert_matches(conn, events)
+
+def reopen(conn):
+    # Exécution CI suivante : la base est reconstruite depuis l'instantané et le journal
+    conn.close()
+    os.remove(match_store.STORE_FILE)
+    return match_store.open_store()
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def test_version_stable_after_compact_and_reopen():
+    conn = match_store.open_store()
+    write(conn, [event(1), event(2)])
+    version = match_store.store_version(conn)
+    match_store.compact_store(conn)
+    conn = reopen(conn)
+    assert match_store.store_version(conn) == version
+    assert match_store.count_matches(conn) == 2
+    conn.close()
+
+def test_version_stable_across_journal_replays():
+    conn = match_store.open_store()
+    versions = []
+    for day in (1, 2, 3):
+        write(conn, [event(i) for i in range(1, day + 1)])
+        versions.append(match_store.store_version(conn))
+        # Relance le même jour : même contenu, même version
+        conn = reopen(conn)
+        write(conn, [event(i) for i in range(1, day + 1)])
+        assert match_store.store_version(conn) == versions[-1]
+        conn = reopen(conn)
+    assert versions == sorted(set(versions))
+    conn.close()
+
+def test_version_changes_with_content():
+    conn = match_store.open_store()
+    write(conn, [event(1, status="postponed")])
+    before = match_store.store_version(conn)
+    conn = reopen(conn)
+    write(conn, [event(1)])
+    assert match_store.store_version(conn) > before
+    after = match_store.store_version(conn)
+    conn = reopen(conn)
+    assert match_store.store_version(conn) == after
+    conn.close()
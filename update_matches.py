@@ -2,108 +2,181 @@
 # -*- coding: utf-8 -*-
 
 """
-update_matches.py - Ajoute les matchs d'hier au cache global all_matches.json
+update_matches.py - Ajoute les matchs d'hier à la base locale des matchs (cache/matches.db)
 Exécution quotidienne (par exemple à minuit) pour maintenir le cache à jour.
+Les matchs sont ajoutés au journal cache/journal.jsonl ; l'instantané matches.npz
+n'est réécrit qu'au compactage (seuil atteint ou option --compact).
+Synchronisation : les jours récents contenant des matchs non résolus (reportés, en cours,
+sans score...) sont retéléchargés et corrigés en place (désactivable avec --no-sync).
+Trous : les jours absents de l'index de couverture (journée manquée par le workflow...)
+sont retéléchargés par lots en parallèle (désactivable avec --no-gaps).
+Exécution : python update_matches.py [--compact] [--no-sync] [--no-gaps]
 """
 
-import requests
-import json
-import os
-from datetime import datetime, timedelta
-import time
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import asyncio
+import sys
+from datetime import date, datetime, timedelta
+
+import bsd_client
+import match_store
 
 # =======================================================
 # CONFIGURATION
 # =======================================================
-API_TOKEN = os.getenv("BSD_API_TOKEN", "3d0b228fb2f078287b8e6720304f2eea2800cc6d")
-BASE_URL = "https://sports.bzzoiro.com/api"
-HEADERS = {"Authorization": f"Token {API_TOKEN}"}
-
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-session.mount('https://', HTTPAdapter(max_retries=retries))
-
-CACHE_DIR = "cache"
-CACHE_FILE = os.path.join(CACHE_DIR, "all_matches.json")
+SYNC_LOOKBACK_DAYS = 30   # fenêtre des matchs non résolus à resynchroniser
+SYNC_BATCH_DAYS = 7       # jours consécutifs regroupés dans une même requête
+GAP_CONCURRENCY = 4       # plages manquantes téléchargées en parallèle
 
-print("="*60)
-print("🔄 MISE À JOUR QUOTIDIENNE DU CACHE")
-print("="*60)
-
-def fetch_events_day(date):
+def fetch_events_day(client, date):
     """
     Récupère tous les événements d'une journée spécifique.
+    Lève bsd_client.IncompleteFetch si une page n'a pas pu être récupérée.
     """
-    url = f"{BASE_URL}/events/"
-    params = {
-        "date_from": date.isoformat(),
-        "date_to": date.isoformat()
-    }
-    all_events = []
-    page = 1
-    while True:
-        params["page"] = page
-        try:
-            resp = session.get(url, headers=HEADERS, params=params, timeout=10)
-            if resp.status_code != 200:
-                print(f"❌ Erreur {resp.status_code}")
-                break
-            data = resp.json()
-            events = data.get("results", [])
-            all_events.extend(events)
-            if data.get("next") is None:
-                break
-            page += 1
-            time.sleep(0.5)
-        except Exception as e:
-            print(f"❌ Exception: {e}")
-            break
-    return all_events
-
-def load_existing_matches():
+    return client.fetch_all_sync("events", bsd_client.date_range_params(date, date), strict=True)
+
+def group_date_ranges(days, max_days=SYNC_BATCH_DAYS):
     """
-    Charge le cache existant, retourne une liste vide si le fichier n'existe pas.
+    Regroupe des jours triés (AAAA-MM-JJ) en plages consécutives d'au plus max_days jours.
     """
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
-
-def save_matches(matches):
+    ranges = []
+    for day in (date.fromisoformat(d) for d in days):
+        if ranges and day == ranges[-1][1] + timedelta(days=1) \
+                and (day - ranges[-1][0]).days < max_days:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+async def sync_unresolved(client, conn, lookback_days=SYNC_LOOKBACK_DAYS):
     """
-    Sauvegarde la liste dans le cache.
+    Retélécharge les jours récents contenant des matchs non résolus et met à jour
+    en place ceux qui ont changé (statut, score...). Retourne le nombre de matchs corrigés.
     """
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(matches, f, indent=2, ensure_ascii=False)
-
-def main():
+    until = datetime.now().date() - timedelta(days=1)
+    days = match_store.unresolved_dates(conn, until - timedelta(days=lookback_days), until)
+    if not days:
+        print("   ✅ Aucun match non résolu à resynchroniser")
+        return 0
+    ranges = group_date_ranges(days)
+    print(f"   🔁 {len(days)} jours à resynchroniser ({len(ranges)} requêtes)")
+
+    # Les plages sont demandées en parallèle, dans les limites du client (débit, endpoint),
+    # sans passer par le cache des réponses (il contient l'état non résolu)
+    results = await asyncio.gather(*(
+        client.fetch_all("events", bsd_client.date_range_params(d1, d2), refresh=True)
+        for d1, d2 in ranges
+    ))
+    events = [e for page in results for e in page]
+    changed = match_store.changed_events(conn, events)
+    match_store.append_journal(conn, changed)
+    match_store.upsert_matches(conn, changed)
+    print(f"   ✅ {len(changed)} matchs corrigés sur {len(events)} retéléchargés")
+    return len(changed)
+
+def split_range(date_from, date_to, max_days=SYNC_BATCH_DAYS):
+    """
+    Découpe une période en plages d'au plus max_days jours.
+    """
+    ranges = []
+    while date_from <= date_to:
+        end = min(date_from + timedelta(days=max_days - 1), date_to)
+        ranges.append((date_from, end))
+        date_from = end + timedelta(days=1)
+    return ranges
+
+async def sync_gaps(client, conn, date_from=match_store.HISTORY_START, date_to=None):
+    """
+    Retélécharge les jours absents de l'index de couverture, par lots de
+    SYNC_BATCH_DAYS jours, GAP_CONCURRENCY lots à la fois. Chaque lot est
+    marqué couvert dès qu'il est enregistré en entier (un lot dont une requête
+    a échoué reste un trou). Retourne le nombre de matchs ajoutés.
+    """
+    date_to = date_to or datetime.now().date() - timedelta(days=1)
+    gaps = match_store.missing_ranges(match_store.load_coverage(conn), date_from, date_to)
+    if not gaps:
+        print("   ✅ Aucun jour manquant")
+        return 0
+    batches = [r for gap in gaps for r in split_range(*gap)]
+    print(f"   🕳️ {sum((b - a).days + 1 for a, b in gaps)} jours manquants "
+          f"({len(gaps)} trous, {len(batches)} requêtes)")
+    semaphore = asyncio.Semaphore(GAP_CONCURRENCY)
+    added = 0
+
+    async def fill(d1, d2):
+        nonlocal added
+        async with semaphore:
+            try:
+                async for page in client.paginate("events", bsd_client.date_range_params(d1, d2),
+                                                  refresh=True, strict=True):
+                    changed = match_store.changed_events(conn, page)
+                    match_store.append_journal(conn, changed)
+                    match_store.upsert_matches(conn, changed)
+                    added += len(changed)
+            except bsd_client.IncompleteFetch as e:
+                print(f"   ⚠️ {d1} → {d2} incomplet ({e}), repris au prochain lancement")
+                return
+            match_store.mark_covered(d1, d2, conn)
+            print(f"   ✅ {d1} → {d2} comblé")
+
+    await asyncio.gather(*(fill(d1, d2) for d1, d2 in batches))
+    print(f"   ✅ {added} matchs ajoutés ou corrigés")
+    return added
+
+def main(compact=False, sync=True, gaps=True, client=None, conn=None):
+    """
+    client, conn : client API et base déjà ouverts (pipeline.py), sinon créés ici
+    (et fermés à la fin).
+    """
+    print("="*60)
+    print("🔄 MISE À JOUR QUOTIDIENNE DU CACHE")
+    print("="*60)
     yesterday = datetime.now().date() - timedelta(days=1)
     print(f"\n📅 Mise à jour avec les matchs du {yesterday}")
 
     # Récupérer les matchs d'hier
-    new_matches = fetch_events_day(yesterday)
-    print(f"   → {len(new_matches)} matchs trouvés")
-
-    if not new_matches:
+    own_client, own_conn = client is None, conn is None
+    client = client or bsd_client.BSDClient()
+    try:
+        new_matches = fetch_events_day(client, yesterday)
+        complete = True
+        print(f"   → {len(new_matches)} matchs trouvés")
+    except bsd_client.IncompleteFetch as e:
+        # Le jour reste absent de l'index de couverture : sync_gaps le reprendra
+        new_matches, complete = [], False
+        print(f"   ⚠️ Téléchargement incomplet ({e})")
+
+    conn = conn or match_store.open_store()
+    if new_matches:
+        known = match_store.existing_ids(conn, [m['id'] for m in new_matches])
+        print(f"   → {len(new_matches) - len(known)} nouveaux matchs, {len(known)} mis à jour")
+
+        # Journal d'abord (persistant), puis upsert dans la base de travail
+        match_store.append_journal(conn, match_store.changed_events(conn, new_matches))
+        match_store.upsert_matches(conn, new_matches)
+        print(f"✅ Base mise à jour : maintenant {match_store.count_matches(conn)} matchs")
+    elif complete:
         print("✅ Aucun nouveau match.")
-        return
-
-    # Charger le cache existant
-    all_matches = load_existing_matches()
-    existing_ids = {m['id'] for m in all_matches}
-
-    # Filtrer les nouveaux qui ne sont pas déjà dans le cache
-    to_add = [m for m in new_matches if m['id'] not in existing_ids]
-    print(f"   → {len(to_add)} nouveaux matchs à ajouter")
-
-    if to_add:
-        all_matches.extend(to_add)
-        save_matches(all_matches)
-        print(f"✅ Cache mis à jour : maintenant {len(all_matches)} matchs")
+    if complete:
+        match_store.mark_covered(yesterday, yesterday, conn)
+
+    if gaps:
+        print("\n🕳️ Recherche des jours manquants")
+        asyncio.run(sync_gaps(client, conn))
+
+    if sync:
+        print(f"\n🔁 Synchronisation des matchs non résolus ({SYNC_LOOKBACK_DAYS} derniers jours)")
+        asyncio.run(sync_unresolved(client, conn))
+    if own_client:
+        client.close()
+
+    entries = match_store.journal_size()
+    if compact or entries >= match_store.JOURNAL_COMPACT_THRESHOLD:
+        match_store.compact_store(conn)
     else:
-        print("✅ Cache déjà à jour.")
+        print(f"   📝 Journal : {entries} lignes (compactage à {match_store.JOURNAL_COMPACT_THRESHOLD})")
+    if own_conn:
+        conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(compact="--compact" in sys.argv, sync="--no-sync" not in sys.argv,
+         gaps="--no-gaps" not in sys.argv)
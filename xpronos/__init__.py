@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+xpronos - Bibliothèque d'analyse de Mr XPRONOS
+Expose le cœur d'analyse H2H (classification, pronostics, vérification) et,
+à la demande, le moteur vectorisé et la base des matchs.
+L'import du paquet ne charge rien : chaque nom est importé au premier accès
+(requests, NumPy, Camoufox... ne sont chargés que si on les utilise).
+
+    import xpronos
+    analysis = xpronos.analyze_h2h(h2h_list, "Équipe A", "Équipe B")
+    xpronos.classify_match_h2h(analysis)
+"""
+
+import importlib
+
+# Nom exposé -> module qui le définit
+_EXPORTS = {
+    # Cœur d'analyse (Python pur)
+    "analyze_h2h": "xpronos.analytics",
+    "classify_match_h2h": "xpronos.analytics",
+    "generate_prediction_h2h": "xpronos.analytics",
+    "verify_prediction": "xpronos.analytics",
+    # Moteur vectorisé (NumPy)
+    "H2HHistory": "h2h_batch",
+    "analyze_fixtures": "h2h_batch",
+    # Base locale des matchs (SQLite)
+    "open_store": "match_store",
+    "get_h2h": "match_store",
+}
+
+# Sous-modules accessibles comme attributs : xpronos.match_store, xpronos.h2h_batch...
+_MODULES = {
+    "analytics": "xpronos.analytics",
+    "h2h_batch": "h2h_batch",
+    "match_store": "match_store",
+    "columnar_cache": "columnar_cache",
+    "snapshot": "snapshot",
+    "bsd_client": "bsd_client",
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    """
+    Import paresseux : le module n'est chargé qu'au premier accès au nom.
+    """
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    elif name in _MODULES:
+        value = importlib.import_module(_MODULES[name])
+    else:
+        raise AttributeError(f"module 'xpronos' has no attribute '{name}'")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_MODULES))
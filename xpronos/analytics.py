@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+xpronos/analytics.py - Cœur d'analyse H2H de Mr XPRONOS (Python pur, sans dépendance)
+- analyze_h2h : bilan des confrontations directes
+- classify_match_h2h : catégorie Simple / VIP
+- generate_prediction_h2h : pronostic double chance / over 2.5
+- verify_prediction : vérification d'un pronostic sur le résultat réel
+Les fonctions travaillent sur des listes H2H au format de match_store.get_h2h().
+"""
+
+# =======================================================
+# FONCTIONS D'ANALYSE H2H
+# =======================================================
+
+def analyze_h2h(h2h_list, current_home_team, current_away_team):
+    """
+    Analyse la liste H2H pour déterminer :
+    - Nombre total de matchs
+    - Victoires domicile/extérieur/nuls
+    - Moyenne de buts
+    - Les 4 derniers matchs (filtrés pour ne garder que les terminés)
+    """
+    home_wins = 0
+    away_wins = 0
+    draws = 0
+    total_goals = 0
+    matches_count = 0
+
+    # Les 4 derniers matchs terminés
+    last_4 = h2h_list[:4]
+
+    for match in h2h_list:
+        matches_count += 1
+        total_goals += match["home_score"] + match["away_score"]
+        if match["home_score"] > match["away_score"]:
+            if match["home_team"] == current_home_team:
+                home_wins += 1
+            else:
+                away_wins += 1
+        elif match["home_score"] < match["away_score"]:
+            if match["away_team"] == current_home_team:
+                home_wins += 1
+            else:
+                away_wins += 1
+        else:
+            draws += 1
+
+    goals_avg = total_goals / matches_count if matches_count > 0 else 0
+    return {
+        "total_matches": matches_count,
+        "home_wins": home_wins,
+        "away_wins": away_wins,
+        "draws": draws,
+        "goals_avg": goals_avg,
+        "last_4": last_4
+    }
+
+def classify_match_h2h(analysis):
+    """
+    Classification :
+    - Si au moins 4 matchs H2H et une équipe a gagné 3 ou 4 fois → VIP
+    - Si au moins 5 matchs H2H et une équipe a gagné au moins N-1 fois → VIP
+    - Sinon → Simple
+    """
+    n = analysis["total_matches"]
+    if n >= 4:
+        if analysis["home_wins"] >= 3 or analysis["away_wins"] >= 3:
+            return "vip"
+    if n >= 5:
+        if analysis["home_wins"] >= n-1 or analysis["away_wins"] >= n-1:
+            return "vip"
+    return "simple"
+
+def generate_prediction_h2h(analysis, home_team, away_team):
+    """
+    Génère un pronostic simple basé sur les 4 derniers H2H terminés.
+    Retourne un dictionnaire avec double_chance, over_25, confidence.
+    """
+    last_4 = analysis["last_4"]
+    home_wins_last4 = 0
+    away_wins_last4 = 0
+    draws_last4 = 0
+    goals_last4 = []
+
+    for m in last_4:
+        goals_last4.append(m["home_score"] + m["away_score"])
+        if m["home_score"] > m["away_score"]:
+            if m["home_team"] == home_team:
+                home_wins_last4 += 1
+            else:
+                away_wins_last4 += 1
+        elif m["home_score"] < m["away_score"]:
+            if m["away_team"] == home_team:
+                home_wins_last4 += 1
+            else:
+                away_wins_last4 += 1
+        else:
+            draws_last4 += 1
+
+    # Double chance
+    if home_wins_last4 > away_wins_last4 + draws_last4:
+        double_chance = "1X"
+    elif away_wins_last4 > home_wins_last4 + draws_last4:
+        double_chance = "X2"
+    else:
+        double_chance = "12"
+
+    # Over/Under 2.5
+    avg_goals = sum(goals_last4) / len(goals_last4) if goals_last4 else 2.5
+    over_25 = avg_goals > 2.5
+
+    # Confiance basée sur le nombre de matchs analysés (max 95)
+    confidence = 50 + (analysis["total_matches"] * 5)
+    confidence = min(confidence, 95)
+
+    return {
+        "double_chance": double_chance,
+        "over_25": over_25,
+        "confidence": confidence
+    }
+
+
+# =======================================================
+# FONCTIONS DE VÉRIFICATION DES MATCHS D'HIER
+# =======================================================
+
+def verify_prediction(match, prediction):
+    """
+    Vérifie si le pronostic (double chance et over 2.5) est validé par le résultat réel.
+    """
+    match['verified_double'] = False
+    match['verified_over'] = False
+
+    if match['status'] != 'finished':
+        return
+
+    home_score = match['home_score']
+    away_score = match['away_score']
+    if home_score is None or away_score is None:
+        return
+
+    total_goals = home_score + away_score
+
+    dc = prediction.get('double_chance', '')
+    if dc == '1X':
+        match['verified_double'] = (home_score > away_score) or (home_score == away_score)
+    elif dc == 'X2':
+        match['verified_double'] = (home_score == away_score) or (home_score < away_score)
+    elif dc == '12':
+        match['verified_double'] = (home_score > away_score) or (home_score < away_score)
+
+    if prediction.get('over_25'):
+        match['verified_over'] = total_goals > 2.5
+    else:
+        match['verified_over'] = total_goals <= 2.5